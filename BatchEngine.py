@@ -0,0 +1,174 @@
+"""Batch engine class"""
+from datetime import datetime
+import numpy as np
+from GameEngine import GameEngine, DIFFICULTY_SETTINGS
+from Maze import Maze
+from PacMan import PacMan
+
+
+class BatchEngine:
+    """Runs many games of one maze and difficulty in lockstep on NumPy arrays
+
+    Every step applies one action per game and ticks all of them, with the
+    same rules, order and scoring as GameEngine.step: Pac-Man's move, the
+    power timer, ghost moves from the maze's next-hop table, collisions
+    ghost by ghost, and the end of the game. Positions are indices into
+    Maze.cells and the pellet grids are a (games, height, width) array in
+    the Maze cell encoding. Finished games stay as they ended until reset.
+    Only mazes small enough for path tables are supported.
+    """
+    ACTIONS = list(GameEngine.ACTIONS)
+    NO_ACTION = -1
+    TICK_RATE = 10
+
+    def __init__(self, games, difficulty='easy', layout=None, respawn_delay=None,
+                 settings=None):
+        self.games = games
+        self.difficulty = difficulty
+        self.settings = dict(DIFFICULTY_SETTINGS[difficulty], **(settings or {}))
+        self.respawn_delay = GameEngine.RESPAWN_DELAY if respawn_delay is None \
+            else respawn_delay
+        self.maze = Maze(difficulty, layout=layout)
+        maze = self.maze
+        self.hops = maze.hop_table()
+        self.cell_flat = np.array([y * maze.width + x for x, y in maze.cells], dtype=np.int64)
+        self.flee = np.array([maze.cell_index[cell] for cell in maze.flee_targets],
+                             dtype=np.int32)
+        self.moves = np.full((len(maze.cells), len(self.ACTIONS)), -1, dtype=np.int32)
+        for i, (x, y) in enumerate(maze.cells):
+            for a, action in enumerate(self.ACTIONS):
+                dx, dy = GameEngine.ACTIONS[action]
+                self.moves[i, a] = maze.cell_index.get((x + dx, y + dy), -1)
+        self.start = maze.cell_index[maze.pacman_start]
+        spawns = maze.ghost_spawns
+        self.spawns = np.array([maze.cell_index[spawns[i % len(spawns)]]
+                                for i in range(self.settings["ghost_count"])], dtype=np.int32)
+        self.initial_grid = np.array(maze.layout, dtype=np.uint8)
+        shape = (games,)
+        self.grid = np.empty(shape + self.initial_grid.shape, dtype=np.uint8)
+        self.flat_grid = self.grid.reshape(games, -1)
+        self.pacman = np.empty(shape, dtype=np.int32)
+        self.ghosts = np.empty((games, len(self.spawns)), dtype=np.int32)
+        self.lives = np.empty(shape, dtype=np.int8)
+        self.score = np.empty(shape, dtype=np.int32)
+        self.powered = np.empty(shape, dtype=bool)
+        self.power_timer = np.empty(shape, dtype=np.int32)
+        self.dots_collected = np.empty(shape, dtype=np.int32)
+        self.ghosts_eaten = np.empty(shape, dtype=np.int32)
+        self.power_pallets_collected = np.empty(shape, dtype=np.int32)
+        self.dots_remaining = np.empty(shape, dtype=np.int32)
+        self.power_pellets_remaining = np.empty(shape, dtype=np.int32)
+        self.timer = np.empty(shape, dtype=np.int32)
+        self.tick_count = np.empty(shape, dtype=np.int32)
+        self.freeze_ticks = np.empty(shape, dtype=np.int32)
+        self.running = np.empty(shape, dtype=bool)
+        self.won = np.empty(shape, dtype=bool)
+        self.reset()
+
+    def reset(self, games=None):
+        """Reset every game, or those selected by an index or mask array"""
+        if games is None:
+            games = slice(None)
+        self.grid[games] = self.initial_grid
+        self.pacman[games] = self.start
+        self.ghosts[games] = self.spawns
+        self.lives[games] = PacMan.START_LIVES
+        self.powered[games] = False
+        for counter in (self.score, self.power_timer, self.dots_collected, self.ghosts_eaten,
+                        self.power_pallets_collected, self.timer, self.tick_count,
+                        self.freeze_ticks):
+            counter[games] = 0
+        self.dots_remaining[games] = self.maze.dots_remaining
+        self.power_pellets_remaining[games] = self.maze.power_pellets_remaining
+        self.running[games] = True
+        self.won[games] = False
+
+    def move_pacman(self, actions):
+        """Move Pac-Man in every running, unfrozen game with an action (index into ACTIONS)"""
+        actions = np.asarray(actions)
+        idx = np.flatnonzero(self.running & (self.freeze_ticks == 0) & (actions >= 0))
+        dest = self.moves[self.pacman[idx], actions[idx]]
+        open_ = dest >= 0
+        idx, dest = idx[open_], dest[open_]
+        self.pacman[idx] = dest
+        flat = self.cell_flat[dest]
+        val = self.flat_grid[idx, flat]
+        dot, power = val == 1, val == 2
+        dots = idx[dot]
+        self.score[dots] += PacMan.DOT_SCORE
+        self.dots_collected[dots] += 1
+        self.dots_remaining[dots] -= 1
+        powers = idx[power]
+        self.score[powers] += PacMan.POWER_SCORE
+        self.power_pallets_collected[powers] += 1
+        self.power_pellets_remaining[powers] -= 1
+        self.powered[powers] = True
+        self.power_timer[powers] = self.settings["power_duration"]
+        eaten = dot | power
+        self.flat_grid[idx[eaten], flat[eaten]] = 3
+
+    def tick(self):
+        """Advance every running game by one tick"""
+        running = self.running
+        self.tick_count[running] += 1
+        frozen = running & (self.freeze_ticks > 0)
+        self.freeze_ticks[frozen] -= 1
+        live = running & ~frozen
+        self.timer[live] += 1
+
+        fading = live & self.powered
+        self.power_timer[fading] -= 1
+        self.powered[fading & (self.power_timer <= 0)] = False
+
+        idx = np.flatnonzero(live & (self.timer % self.settings["ghost_speed"] == 0))
+        if idx.size:
+            pacman = self.pacman[idx]
+            target = np.where(self.powered[idx], self.flee[pacman], pacman)
+            ghosts = self.ghosts[idx]
+            hops = self.hops[ghosts, target[:, None]]
+            self.ghosts[idx] = np.where(hops >= 0, hops, ghosts)
+
+        for g in range(self.ghosts.shape[1]):
+            hit = live & (self.ghosts[:, g] == self.pacman)
+            if not hit.any():
+                continue
+            eat = hit & self.powered
+            self.ghosts[eat, g] = self.spawns[g]
+            self.ghosts_eaten[eat] += 1
+            self.score[eat] += PacMan.GHOST_SCORE
+            lose = hit & ~self.powered
+            self.lives[lose] -= 1
+            self.pacman[lose] = self.start
+            self.ghosts[lose] = self.spawns
+            self.freeze_ticks[lose] = self.respawn_delay
+
+        cleared = self.dots_remaining + self.power_pellets_remaining == 0
+        over = live & (cleared | (self.lives <= 0))
+        self.won[over] = cleared[over]
+        self.running[over] = False
+
+    def step(self, actions):
+        """Apply one action per game (NO_ACTION for none), then tick; return running"""
+        self.move_pacman(actions)
+        self.tick()
+        return self.running
+
+    def positions(self, cells):
+        """(x, y) arrays of an array of cell indices"""
+        flat = self.cell_flat[cells]
+        return flat % self.maze.width, flat // self.maze.width
+
+    def rows(self, games=None):
+        """Statistics rows, in the StatisticsManager.record_data schema, for some games"""
+        idx = np.arange(self.games) if games is None else np.arange(self.games)[games]
+        now = datetime.now().isoformat()
+        return [{
+            'timestamp': now,
+            'score': int(self.score[i]),
+            'duration': int(self.timer[i]) // self.TICK_RATE,
+            'lives_lost': PacMan.START_LIVES - int(self.lives[i]),
+            'dots_collected': int(self.dots_collected[i]),
+            'ghosts_eaten': int(self.ghosts_eaten[i]),
+            'power_pallets_collected': int(self.power_pallets_collected[i]),
+            'difficulty': self.difficulty
+        } for i in idx]
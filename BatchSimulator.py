@@ -0,0 +1,152 @@
+"""Batch simulator class"""
+import random
+import time
+from collections import deque
+from datetime import datetime
+from multiprocessing import Pool
+from GameEngine import GameEngine
+from MazeGenerator import MazeGenerator
+from PacMan import PacMan
+
+
+class BatchSimulator:
+    """Plays seeded headless games across a process pool
+
+    Each game runs on GameEngine with the normal Ghost AI and PacMan scoring,
+    one policy action per tick. Results are yielded as rows in the schema
+    StatisticsManager.record_data produces, as games finish, plus an
+    'outcome' key: 'cleared', 'lost' or 'timeout' for a game cut off at
+    max_ticks. A maze given as
+    (width, height, seed) replaces the bundled layouts with a MazeGenerator
+    arena, generated once per worker process.
+    """
+    POLICIES = ['random', 'greedy']
+    MAX_TICKS = 20000
+    TICK_RATE = 10
+    _engines = {}
+
+    def __init__(self, difficulties=('easy', 'normal', 'hard'), games=100, policy='random',
+                 seed=0, processes=None, settings=None, max_ticks=MAX_TICKS, maze=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; choose from {self.POLICIES}")
+        self.difficulties = list(difficulties)
+        self.games = games
+        self.policy = policy
+        self.seed = seed
+        self.processes = processes
+        self.settings = settings or {}
+        self.max_ticks = max_ticks
+        self.maze = maze
+        self.games_played = 0
+        self.elapsed = 0.0
+
+    def jobs(self):
+        """Yield one (difficulty, seed, policy, settings, max_ticks, maze) job per game"""
+        for difficulty in self.difficulties:
+            for i in range(self.games):
+                yield (difficulty, self.seed + i, self.policy, self.settings, self.max_ticks,
+                       self.maze)
+
+    def run(self, chunksize=64):
+        """Play every game, yielding result rows in completion order"""
+        start = time.perf_counter()
+        self.games_played = 0
+        with Pool(self.processes) as pool:
+            for row in pool.imap_unordered(BatchSimulator.play_game, self.jobs(), chunksize):
+                self.games_played += 1
+                self.elapsed = time.perf_counter() - start
+                yield row
+        self.elapsed = time.perf_counter() - start
+
+    def games_per_second(self):
+        """Games finished per second of wall-clock time so far"""
+        return self.games_played / self.elapsed if self.elapsed > 0 else 0.0
+
+    @staticmethod
+    def play_game(job):
+        """Play one game to the end and return its statistics row"""
+        difficulty, seed, policy, settings, max_ticks, maze = job
+        rng = random.Random(seed)
+        key = (difficulty, tuple(sorted(settings.items())), maze)
+        engine = BatchSimulator._engines.get(key)
+        if engine is None:
+            layout = MazeGenerator(*maze).generate() if maze else None
+            engine = GameEngine(difficulty, layout=layout, settings=settings)
+            BatchSimulator._engines[key] = engine
+        else:
+            engine.reset()
+        choose = BatchSimulator.random_action if policy == 'random' \
+            else BatchSimulator.greedy_action
+        heading = None
+        while engine.game_state == 'running' and engine.timer < max_ticks:
+            heading = choose(engine, rng, heading)
+            engine.step(heading)
+        pacman = engine.pacman
+        if engine.game_state == 'running':
+            outcome = 'timeout'
+        else:
+            outcome = 'cleared' if engine.won else 'lost'
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'score': pacman.score,
+            'duration': engine.timer // BatchSimulator.TICK_RATE,
+            'lives_lost': PacMan.START_LIVES - pacman.lives,
+            'dots_collected': pacman.dots_collected,
+            'ghosts_eaten': pacman.ghosts_eaten,
+            'power_pallets_collected': pacman.power_pallets_collected,
+            'difficulty': difficulty,
+            'outcome': outcome
+        }
+
+    @staticmethod
+    def _open_actions(engine):
+        """Actions that do not walk Pac-Man into a wall"""
+        x, y = engine.pacman.x, engine.pacman.y
+        return [action for action, (dx, dy) in GameEngine.ACTIONS.items()
+                if not engine.maze.check_collision(x + dx, y + dy)]
+
+    @staticmethod
+    def random_action(engine, rng, heading):
+        """Keep the current heading, turning at random when blocked or now and then"""
+        actions = BatchSimulator._open_actions(engine)
+        if not actions:
+            return None
+        if heading in actions and rng.random() < 0.8:
+            return heading
+        return rng.choice(actions)
+
+    @staticmethod
+    def greedy_action(engine, rng, heading):
+        """Head for the nearest pellet, avoiding cells next to a ghost unless powered
+
+        Ties between equally near pellets are broken by the game's seed.
+        """
+        maze = engine.maze
+        pacman = engine.pacman
+        start = (pacman.x, pacman.y)
+        danger = set()
+        if pacman.state != pacman.POWERED_STATE:
+            for ghost in engine.ghosts:
+                danger.add((ghost.x, ghost.y))
+                danger.update(maze.walkable_neighbors(ghost.x, ghost.y))
+        first = {}
+        queue = deque()
+        actions = BatchSimulator._open_actions(engine)
+        rng.shuffle(actions)
+        for action in actions:
+            dx, dy = GameEngine.ACTIONS[action]
+            cell = (start[0] + dx, start[1] + dy)
+            if cell not in danger:
+                first[cell] = action
+                queue.append(cell)
+        seen = set(first) | {start}
+        while queue:
+            cell = queue.popleft()
+            if maze.layout[cell[1]][cell[0]] in (1, 2):
+                return first[cell]
+            for neighbor in maze.walkable_neighbors(*cell):
+                if neighbor not in seen and neighbor not in danger:
+                    seen.add(neighbor)
+                    first[neighbor] = first[cell]
+                    queue.append(neighbor)
+        return BatchSimulator.random_action(engine, rng, heading)
@@ -0,0 +1,503 @@
+"""Benchmark suite class"""
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import closing, redirect_stdout
+from datetime import datetime, timedelta
+from maze_layout import LAYOUTS
+from Maze import Maze
+from MazeGenerator import MazeGenerator
+from Ghost import Ghost
+from GameEngine import GameEngine
+from StatsStore import StatsStore
+
+
+class StubTurtle:
+    """Stands in for a turtle, screen or Tk widget; every call is a no-op"""
+
+    def __init__(self):
+        self.screen = self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class AggCanvas:
+    """Renders a figure off screen in place of FigureCanvasTkAgg"""
+
+    def __init__(self, fig):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.agg = FigureCanvasAgg(fig)
+
+    def draw(self):
+        """Render the figure"""
+        self.agg.draw()
+
+    def get_tk_widget(self):
+        """Return a widget that ignores packing"""
+        return StubTurtle()
+
+
+class BenchmarkSuite:
+    """Times the game's hot paths and compares the results with a stored baseline
+
+    Every benchmark records the median and minimum seconds per call over
+    a number of repeats. Synthetic statistics databases are generated once
+    per size in data_dir and reused by later runs.
+    """
+    SIZES = (10_000, 1_000_000, 10_000_000)
+    SCALES = (1, 3, 6)
+    ARENAS = (101, 301, 1000)
+    ASTAR_ARENA_LIMIT = 101
+    CHASE_STEPS = 200
+    CHASERS = 4
+    TOLERANCE = 0.25
+    NOISE_FLOOR = 0.000001
+    MIN_SAMPLE_TIME = 0.05
+    TICKS = 500
+    STARTUP_PROBE = (
+        "import sys, tkinter\n"
+        "def menu_shown(self, n=0):\n"
+        "    raise SystemExit(0)\n"
+        "tkinter.Misc.mainloop = menu_shown\n"
+        "sys.argv = ['main.py']\n"
+        "import main\n"
+        "main.main()\n"
+    )
+    GHOST_COUNTS = (4, 32)
+    BATCH_GAMES = (1000, 100_000)
+
+    def __init__(self, sizes=SIZES, scales=SCALES, repeats=5, data_dir='bench_data',
+                 only=None, seed=0, arenas=ARENAS):
+        self.sizes = sizes
+        self.scales = scales
+        self.arenas = arenas
+        self.repeats = repeats
+        self.data_dir = data_dir
+        self.only = only
+        self.seed = seed
+        self.results = {}
+
+    def wanted(self, name):
+        """True if a benchmark name passes the --only filter"""
+        return not self.only or any(part in name for part in self.only)
+
+    def measure(self, name, func, setup=None, repeats=None, number=None):
+        """Time func() number times per repeat; setup() runs untimed before each repeat
+
+        Without a setup and a number, func runs often enough per repeat to
+        take at least MIN_SAMPLE_TIME, which keeps fast benchmarks stable.
+        """
+        if not self.wanted(name):
+            return None
+        if number is None:
+            number = 1
+            if setup is None:
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+                number = max(1, int(self.MIN_SAMPLE_TIME / max(elapsed, 1e-9)))
+        samples = []
+        for _ in range(repeats or self.repeats):
+            state = setup() if setup else None
+            gc.collect()
+            start = time.perf_counter()
+            for _ in range(number):
+                func(state) if setup else func()
+            samples.append((time.perf_counter() - start) / number)
+        result = {'median': statistics.median(samples), 'min': min(samples),
+                  'repeats': len(samples), 'number': number}
+        self.results[name] = result
+        print(f"{name:55s} {result['median'] * 1000:10.3f} ms", file=sys.stderr)
+        return result
+
+    @staticmethod
+    def scaled_layout(layout, k):
+        """Blow every cell of a layout up into a k x k block
+
+        Walls stay walls and corridors become k cells wide, so the maze keeps
+        its connectivity. Starts and spawns keep one cell; the rest of each
+        corridor block is filled with dots.
+        """
+        scaled = []
+        for row in layout:
+            block_rows = [[], []]
+            for cell in row:
+                block_rows[0].append(cell)
+                block_rows[0].extend([0 if cell == 0 else 1] * (k - 1))
+                block_rows[1].extend([0 if cell == 0 else 1] * k)
+            scaled.append(block_rows[0])
+            scaled.extend([list(block_rows[1]) for _ in range(k - 1)])
+        return scaled
+
+    def mazes(self):
+        """Yield (label, difficulty, layout) for the bundled and scaled mazes"""
+        for difficulty in ('easy', 'hard'):
+            for k in self.scales:
+                layout = LAYOUTS[difficulty] if k == 1 else self.scaled_layout(LAYOUTS[difficulty], k)
+                yield f"{difficulty}.x{k}", difficulty, layout
+
+    def launch(self, *args):
+        """Run a fresh interpreter in data_dir with the game on its path; return its exit code"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run([sys.executable, *args], cwd=self.data_dir, env=env,
+                              capture_output=True, check=False).returncode
+
+    def bench_startup(self):
+        """Fresh interpreter start: importing the game, and launch to the main menu
+
+        The main menu run stops as soon as the menu's mainloop starts. It
+        needs a display and is skipped without one.
+        """
+        self.measure("startup.import", lambda: self.launch('-c', 'import GameController'))
+        if not self.wanted("startup.main_menu"):
+            return
+        if self.launch('-c', self.STARTUP_PROBE) != 0:
+            print("startup.main_menu skipped: the main menu could not be shown", file=sys.stderr)
+            return
+        self.measure("startup.main_menu", lambda: self.launch('-c', self.STARTUP_PROBE))
+
+    def bench_maze(self):
+        """Maze construction (cold and with cached path tables) and load_maze"""
+        drawer = StubTurtle()
+        for label, difficulty, layout in self.mazes():
+            self.measure(f"maze.construct.cold.{label}", lambda maze: Maze(difficulty, layout),
+                         setup=Maze._path_tables.clear)
+            Maze(difficulty, layout)
+            self.measure(f"maze.construct.{label}", lambda: Maze(difficulty, layout))
+            maze = Maze(difficulty, layout)
+            self.measure(f"maze.load_maze.{label}", lambda: maze.load_maze(drawer))
+
+    def bench_pathfinding(self):
+        """Ghost.pathfinding (A*) and Ghost.move, normal and powered"""
+        for label, difficulty, layout in self.mazes():
+            maze = Maze(difficulty, layout)
+            rng = random.Random(self.seed)
+            cells = [(x, y) for y in range(maze.height) for x in range(maze.width)
+                     if not maze.check_collision(x, y)]
+            targets = [rng.choice(cells) for _ in range(50)]
+            ghost = Ghost(maze, spawn=maze.ghost_spawns[0], render=False)
+            for powered in (False, True):
+                mode = 'powered' if powered else 'normal'
+                self.measure(f"ghost.pathfinding.{mode}.{label}",
+                             lambda: [ghost.pathfinding(x, y, powered) for x, y in targets])
+
+                def move(powered=powered):
+                    for x, y in targets:
+                        ghost.x, ghost.y = maze.ghost_spawns[0]
+                        ghost.move(x, y, powered)
+                self.measure(f"ghost.move.{mode}.{label}", move)
+
+    def bench_arena(self):
+        """Generated square mazes: generation, cluster pathfinder build and queries
+
+        arena.chase has CHASERS ghosts follow a goal walking CHASE_STEPS cells,
+        so the goal keeps crossing into new cluster parts. A* is timed on the
+        smaller arenas only, for comparison.
+        """
+        for size in self.arenas:
+            if not any(self.wanted(f"arena.{kind}.{size}")
+                       for kind in ('generate', 'cluster_build', 'next_step', 'chase',
+                                    'astar')):
+                continue
+            repeats = self.repeats if size < 1000 else 1
+            generator = MazeGenerator(size, size, seed=self.seed)
+            self.measure(f"arena.generate.{size}", generator.generate, repeats=repeats)
+            maze = Maze('hard', generator.generate())
+
+            def fresh(maze=maze):
+                Maze._hierarchies.clear()
+                maze._hierarchy = None
+                return maze
+            self.measure(f"arena.cluster_build.{size}", lambda maze: maze.hierarchy(),
+                         setup=fresh, repeats=repeats)
+            pathfinder = maze.hierarchy()
+            rng = random.Random(self.seed)
+            cells = [(x, y) for y in range(maze.height) for x in range(maze.width)
+                     if not maze.check_collision(x, y)]
+            goal = rng.choice(cells)
+            starts = [rng.choice(cells) for _ in range(50)]
+            pathfinder.next_step(starts[0], goal)
+            self.measure(f"arena.next_step.{size}",
+                         lambda: [pathfinder.next_step(start, goal) for start in starts])
+            route = self.route(maze, rng.choice(cells), self.CHASE_STEPS)
+
+            def chase_setup(pathfinder=pathfinder, starts=starts):
+                pathfinder.forget_fields()
+                return list(starts[:self.CHASERS])
+
+            def chase(ghosts, pathfinder=pathfinder, route=route):
+                for goal in route:
+                    for i, ghost in enumerate(ghosts):
+                        ghosts[i] = pathfinder.next_step(ghost, goal) or ghost
+            self.measure(f"arena.chase.{size}", chase, setup=chase_setup, repeats=repeats,
+                         number=1)
+            if size <= self.ASTAR_ARENA_LIMIT:
+                ghost = Ghost(maze, spawn=maze.ghost_spawns[0], render=False)
+
+                def astar():
+                    for x, y in starts:
+                        ghost.x, ghost.y = x, y
+                        ghost.pathfinding(*goal)
+                self.measure(f"arena.astar.{size}", astar)
+
+    @staticmethod
+    def route(maze, start, steps):
+        """A walk of up to steps cells from start that never turns back unless stuck"""
+        rng = random.Random(steps)
+        route, prev = [start], None
+        for _ in range(steps - 1):
+            x, y = route[-1]
+            options = [(x + dx, y + dy) for dx, dy in Maze.NEIGHBOR_OFFSETS
+                       if not maze.check_collision(x + dx, y + dy)]
+            forward = [cell for cell in options if cell != prev] or options
+            if not forward:
+                break
+            prev = route[-1]
+            route.append(rng.choice(forward))
+        return route
+
+    def bench_batch(self):
+        """BatchEngine.step on hard with random actions, restarting finished games"""
+        try:
+            import numpy as np
+            from BatchEngine import BatchEngine
+        except ImportError:
+            print("batch.step skipped: numpy is not installed", file=sys.stderr)
+            return
+        for games in self.BATCH_GAMES:
+            name = f"batch.step.{games}"
+            if not self.wanted(name):
+                continue
+            engine = BatchEngine(games, 'hard')
+            rng = np.random.default_rng(self.seed)
+            actions = rng.integers(0, len(BatchEngine.ACTIONS), (16, games))
+            ticks = iter(range(10 ** 12))
+
+            def step(engine=engine, actions=actions, ticks=ticks):
+                if not engine.running.all():
+                    engine.reset(~engine.running)
+                engine.step(actions[next(ticks) % len(actions)])
+            result = self.measure(name, step)
+            if result:
+                print(f"{'':55s} {games / result['median'] / 1e6:10.2f} M game-ticks/s",
+                      file=sys.stderr)
+
+    @staticmethod
+    def has_tk(kind):
+        """Whether tkinter imports; reports kind as skipped when it does not"""
+        try:
+            import tkinter
+        except ImportError:
+            print(f"{kind} skipped: tkinter is not installed", file=sys.stderr)
+            return False
+        return True
+
+    def controller(self, difficulty, layout=None, db_path=None):
+        """A GameController wired to a headless engine and stub rendering"""
+        from GameController import GameController
+        from StatisticsManager import StatisticsManager
+        os.makedirs(self.data_dir, exist_ok=True)
+        controller = GameController(StubTurtle())
+        controller.stats_manager = StatisticsManager(
+            db_path or os.path.join(self.data_dir, 'ticks.db'), None)
+        controller.game_state = 'running'
+        controller.game_mode = difficulty
+        controller.engine = GameEngine(difficulty, layout=layout)
+        controller.maze = controller.engine.maze
+        controller.pacman = controller.engine.pacman
+        controller.ghosts = controller.engine.ghosts
+        controller.scheduler = StubTurtle()
+        controller.game_over_screen = lambda win=True: None
+        return controller
+
+    def bench_tick(self):
+        """Controller and engine ticks, check_win_condition, state snapshots and hashes"""
+        screen = StubTurtle()
+        controllers = self.has_tk("tick.update_game_state")
+        for label, difficulty, layout in self.mazes():
+            def setup(difficulty=difficulty, layout=layout):
+                controller = self.controller(difficulty, layout)
+                controller.rng = random.Random(self.seed)
+                return controller
+
+            def tick(controller, actions=tuple(GameEngine.ACTIONS)):
+                if controller.game_state != 'running':
+                    controller.engine.reset()
+                    controller.pacman = controller.engine.pacman
+                    controller.ghosts = controller.engine.ghosts
+                    controller.game_state = 'running'
+                controller.engine.move_pacman(controller.rng.choice(actions))
+                controller.update_game_state(screen)
+            if controllers:
+                with redirect_stdout(io.StringIO()):
+                    self.measure(f"tick.update_game_state.{label}", tick, setup=setup,
+                                 number=self.TICKS)
+            engine = GameEngine(difficulty, layout=layout)
+            self.measure(f"tick.check_win_condition.{label}", engine.check_win_condition)
+            state = engine.snapshot()
+            self.measure(f"state.snapshot.{label}", engine.snapshot)
+            self.measure(f"state.restore.{label}", lambda: engine.restore(state))
+            self.measure(f"state.hash.{label}", engine.state_hash)
+            for count in self.GHOST_COUNTS:
+                def engine_setup(difficulty=difficulty, layout=layout, count=count):
+                    return (GameEngine(difficulty, layout=layout, settings={'ghost_count': count}),
+                            random.Random(self.seed))
+
+                def engine_tick(state, actions=tuple(GameEngine.ACTIONS)):
+                    engine, rng = state
+                    if engine.game_state != 'running':
+                        engine.reset()
+                    engine.step(rng.choice(actions))
+                self.measure(f"tick.engine.ghosts{count}.{label}", engine_tick,
+                             setup=engine_setup, number=self.TICKS)
+
+    def stats_db(self, rows):
+        """Path of a synthetic statistics database with the given number of rows"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = os.path.join(self.data_dir, f"stats_{rows}.db")
+        if os.path.isfile(path):
+            return path
+        print(f"Generating {rows} synthetic statistics rows in {path}", file=sys.stderr)
+        rng = random.Random(self.seed)
+        start = datetime(2024, 1, 1)
+        store = StatsStore(path + '.tmp', None)
+        batch = []
+        for i in range(rows):
+            difficulty = rng.choice(('easy', 'normal', 'hard'))
+            dots = rng.randint(0, 90)
+            ghosts = rng.randint(0, 6)
+            power = rng.randint(0, 4)
+            batch.append({
+                'timestamp': (start + timedelta(seconds=i)).isoformat(),
+                'score': dots * 10 + power * 50 + ghosts * 200,
+                'duration': rng.randint(0, 300),
+                'lives_lost': rng.randint(0, 3),
+                'dots_collected': dots,
+                'ghosts_eaten': ghosts,
+                'power_pellets_collected': power,
+                'difficulty': difficulty
+            })
+            if len(batch) >= 100_000:
+                store.append_rows(batch)
+                batch = []
+        if batch:
+            store.append_rows(batch)
+        with closing(store.connect()) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + '.tmp' + suffix):
+                os.remove(path + '.tmp' + suffix)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def manager(self, path):
+        """A StatisticsManager on a database, with off-screen chart canvases"""
+        from matplotlib.figure import Figure
+        from StatisticsManager import StatisticsManager
+        manager = StatisticsManager(path, None)
+        manager.win = StubTurtle()
+        for choice in manager.CHARTS:
+            fig = Figure(figsize=(8, 5))
+            manager.charts[choice] = (fig, AggCanvas(fig))
+        return manager
+
+    def bench_stats(self):
+        """generate_report, loading the chart data and drawing each chart"""
+        if not self.has_tk("stats"):
+            return
+        from StatisticsManager import StatisticsManager
+        for rows in self.sizes:
+            label = f"{rows // 1000}k" if rows < 1_000_000 else f"{rows // 1_000_000}M"
+            names = [f"stats.{kind}.{label}" for kind in ('generate_report', 'load')] + \
+                [f"plot.{self.slug(choice)}.{label}" for choice in StatisticsManager.CHARTS]
+            if not any(self.wanted(name) for name in names):
+                continue
+            path = self.stats_db(rows)
+            repeats = self.repeats if rows < 1_000_000 else 1
+
+            def report_setup(path=path):
+                manager = StatisticsManager(path, None)
+                manager.player_data = {key: [value] for key, value in {
+                    'timestamp': datetime.now().isoformat(), 'score': 100, 'duration': 10,
+                    'lives_lost': 3, 'dots_collected': 10, 'ghosts_eaten': 0,
+                    'power_pallets_collected': 0, 'difficulty': 'easy'}.items()}
+                return manager
+            self.measure(names[0], lambda manager: manager.generate_report(), setup=report_setup)
+
+            manager = self.manager(path)
+            self.measure(names[1], manager.aggregate_history, repeats=repeats)
+            manager.chart_cache.get(manager.CHARTS[0])
+            for choice, name in zip(manager.CHARTS, names[2:]):
+                def fresh(manager=manager, choice=choice):
+                    manager.chart_cache.entries.pop(choice, None)
+                    manager.drawn.pop(choice, None)
+                    return manager
+                self.measure(name, lambda manager, choice=choice: manager.update_plot(choice),
+                             setup=fresh)
+
+    @staticmethod
+    def slug(choice):
+        """Benchmark name fragment for a chart title"""
+        return choice.lower().replace(' ', '_')
+
+    def run(self):
+        """Run every benchmark and return the results document"""
+        self.results = {}
+        self.bench_startup()
+        self.bench_maze()
+        self.bench_pathfinding()
+        self.bench_arena()
+        self.bench_tick()
+        self.bench_batch()
+        self.bench_stats()
+        return {
+            'meta': {
+                'created': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeats': self.repeats
+            },
+            'benchmarks': self.results
+        }
+
+    @staticmethod
+    def save(document, path):
+        """Write a results document as JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(path):
+        """Read a results document"""
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def compare(cls, document, baseline, tolerance=TOLERANCE):
+        """Return (name, baseline, current, ratio) for every benchmark that regressed
+
+        A benchmark regresses when its fastest repeat is more than tolerance
+        slower than the baseline's, by at least NOISE_FLOOR seconds. The
+        minimum is the figure least disturbed by other load on the machine.
+        """
+        regressions = []
+        for name, result in document['benchmarks'].items():
+            base = baseline['benchmarks'].get(name)
+            if base is None:
+                continue
+            now, before = result['min'], base['min']
+            if now > before * (1 + tolerance) and now - before >= cls.NOISE_FLOOR:
+                regressions.append((name, before, now, now / before if before else float('inf')))
+        return regressions
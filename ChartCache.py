@@ -0,0 +1,53 @@
+"""Chart cache class"""
+import threading
+
+
+class ChartCache:
+    """Memoizes computed chart series keyed on the statistics data version
+
+    load() reads the data the charts share and compute(choice, data) turns
+    it into one chart's series. Both run at most once per data version, and
+    prefetch() fills the stale charts on a background thread.
+    """
+
+    def __init__(self, load, compute, version):
+        self.load = load
+        self.compute = compute
+        self.version = version
+        self.data = None
+        self.data_key = None
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def _data(self, key):
+        """Return the shared data for a version, loading it once"""
+        if self.data_key != key:
+            self.data = self.load()
+            self.data_key = key
+        return self.data
+
+    def get(self, choice):
+        """Return (key, series) for a chart, computing it only if stale"""
+        key = self.version()
+        with self.lock:
+            entry = self.entries.get(choice)
+            if entry is None or entry[0] != key:
+                entry = (key, self.compute(choice, self._data(key)))
+                self.entries[choice] = entry
+            return entry
+
+    def ready(self, choice):
+        """Return the cached (key, series) of a chart if it is current, else None"""
+        key = self.version()
+        entry = self.entries.get(choice)
+        return entry if entry is not None and entry[0] == key else None
+
+    def prefetch(self, choices):
+        """Compute every stale chart in the background"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(
+            target=lambda: [self.get(choice) for choice in choices],
+            name="ChartCache", daemon=True)
+        self.thread.start()
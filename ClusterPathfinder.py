@@ -0,0 +1,244 @@
+"""Cluster pathfinder class"""
+import heapq
+from collections import deque
+
+
+class ClusterPathfinder:
+    """Hierarchical pathfinding over square clusters of a large maze
+
+    The grid is cut into cluster_size squares, and each square into parts
+    that are connected inside it. Where a run of open cells crosses a
+    cluster border, its middle cell on either side becomes a node; the two
+    are joined by one step, and the nodes of a part are joined by their
+    distances inside it. That graph is far smaller than the grid.
+
+    Towards a goal, a Dijkstra over the graph from the goal's part gives
+    nodes their distance to that part. It is cached per part and resumed
+    by later queries, and each query settles at most SETTLE_BUDGET nodes
+    of it, so a new goal part never stalls the game. Queries from parts
+    it has not reached yet follow the last complete field instead, towards
+    where the goal was, while the next one is completed a budget at a time.
+    A query then
+    searches the start's cluster alone, which keeps its cost tied to the
+    cluster size instead of the maze's area. Paths are shortest through
+    the node graph, not always shortest on the grid.
+    """
+    CLUSTER_SIZE = 16
+    FIELD_CACHE_SIZE = 8
+    SETTLE_BUDGET = 256
+    NEIGHBOR_OFFSETS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+    def __init__(self, width, height, is_open, cluster_size=CLUSTER_SIZE):
+        """Build the graph for a grid; is_open holds one truth value per cell, row-major"""
+        self.width = width
+        self.height = height
+        self.is_open = is_open
+        self.cluster_size = cluster_size
+        self.part = [-1] * (width * height)
+        self.part_nodes = []
+        self.node_cells = []
+        self.cell_nodes = {}
+        self.edges = []
+        self._fields = {}
+        self._complete = None
+        self._background = None
+        self._label_parts()
+        self._add_entrances()
+        self._link_parts()
+
+    def _bounds(self, cell):
+        """(x0, y0, x1, y1) of the cluster holding a cell, end exclusive"""
+        size = self.cluster_size
+        x0 = cell % self.width // size * size
+        y0 = cell // self.width // size * size
+        return x0, y0, min(x0 + size, self.width), min(y0 + size, self.height)
+
+    def _local_bfs(self, source, targets=None):
+        """Breadth-first distances and parents from a cell, staying inside its cluster
+
+        With a set of target cells the search stops once it has reached them all.
+        """
+        width, is_open = self.width, self.is_open
+        x0, y0, x1, y1 = self._bounds(source)
+        dist = {source: 0}
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            x, y = current % width, current // width
+            step = dist[current] + 1
+            for nxt, inside in ((current + width, y + 1 < y1), (current + 1, x + 1 < x1),
+                                (current - width, y > y0), (current - 1, x > x0)):
+                if inside and is_open[nxt] and nxt not in dist:
+                    dist[nxt] = step
+                    parent[nxt] = current
+                    queue.append(nxt)
+                    if targets is not None and nxt in targets:
+                        targets.discard(nxt)
+                        if not targets:
+                            return dist, parent
+        return dist, parent
+
+    def _label_parts(self):
+        """Give every open cell the id of its connected part within its cluster"""
+        part = self.part
+        for cell, cell_open in enumerate(self.is_open):
+            if cell_open and part[cell] < 0:
+                label = len(self.part_nodes)
+                self.part_nodes.append([])
+                for member in self._local_bfs(cell)[0]:
+                    part[member] = label
+
+    def _node(self, cell):
+        """Node id of a cell, adding the node if needed"""
+        node = self.cell_nodes.get(cell)
+        if node is None:
+            node = self.cell_nodes[cell] = len(self.node_cells)
+            self.node_cells.append(cell)
+            self.edges.append([])
+            self.part_nodes[self.part[cell]].append(node)
+        return node
+
+    def _add_entrances(self):
+        """Add a node pair at the middle of every open run across a cluster border"""
+        width, height, size, is_open = self.width, self.height, self.cluster_size, self.is_open
+        borders = [(x, 1, range(height)) for x in range(size, width, size)]
+        borders += [(y, width, range(width)) for y in range(size, height, size)]
+        for line, step, along in borders:
+            run = []
+            for pos in along:
+                if step == 1:
+                    inner, outer = pos * width + line - 1, pos * width + line
+                else:
+                    inner, outer = (line - 1) * width + pos, line * width + pos
+                crossing = is_open[inner] and is_open[outer]
+                if crossing and run and pos % size == 0:
+                    self._join(run)
+                    run = []
+                if crossing:
+                    run.append((inner, outer))
+                elif run:
+                    self._join(run)
+                    run = []
+            if run:
+                self._join(run)
+
+    def _join(self, run):
+        """Link the middle crossing of a run of open cells across a border"""
+        inner, outer = run[len(run) // 2]
+        a, b = self._node(inner), self._node(outer)
+        self.edges[a].append((b, 1))
+        self.edges[b].append((a, 1))
+
+    def _link_parts(self):
+        """Join the nodes of each part by their distance inside it"""
+        cells = self.node_cells
+        for nodes in self.part_nodes:
+            for i, node in enumerate(nodes[:-1]):
+                later = nodes[i + 1:]
+                dist = self._local_bfs(cells[node], {cells[other] for other in later})[0]
+                for other in later:
+                    cost = dist[cells[other]]
+                    self.edges[node].append((other, cost))
+                    self.edges[other].append((node, cost))
+
+    def forget_fields(self):
+        """Drop every cached distance field"""
+        self._fields = {}
+        self._complete = None
+        self._background = None
+
+    def _entry(self, part):
+        """(field, settled, frontier) of the Dijkstra from a part, started if needed"""
+        entry = self._fields.get(part)
+        if entry is None:
+            field = [float('inf')] * len(self.node_cells)
+            frontier = []
+            for node in self.part_nodes[part]:
+                field[node] = 0
+                frontier.append((0, node))
+            kept = (self._complete, self._background)
+            while len(self._fields) >= self.FIELD_CACHE_SIZE:
+                self._fields.pop(next(key for key in self._fields if key not in kept))
+            entry = self._fields[part] = (field, bytearray(len(self.node_cells)), frontier)
+        return entry
+
+    def _settle(self, entry, nodes=None, budget=None):
+        """Run a field's Dijkstra until nodes (or all nodes) are settled; True once they are
+
+        With a budget it stops after settling that many nodes and resumes on
+        the next call.
+        """
+        field, settled, frontier = entry
+        wanted = None if nodes is None else {node for node in nodes if not settled[node]}
+        while frontier and (wanted is None or wanted) and budget != 0:
+            dist, node = heapq.heappop(frontier)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            if wanted is not None:
+                wanted.discard(node)
+            if budget is not None:
+                budget -= 1
+            for other, cost in self.edges[node]:
+                if dist + cost < field[other]:
+                    field[other] = dist + cost
+                    heapq.heappush(frontier, (dist + cost, other))
+        return not frontier or (wanted is not None and not wanted)
+
+    def _field(self, part, source_part):
+        """Distance from the nodes of source_part towards a part
+
+        Every query gives SETTLE_BUDGET settled nodes to completing a field
+        in the background and as many to the goal part's field. If that does
+        not reach the source part, the last complete field, towards an
+        earlier goal part, is used instead. Only without one is a field run
+        to the end at once.
+        """
+        entry = self._entry(part)
+        if self._background not in self._fields:
+            self._background = part
+        if self._settle(self._fields[self._background], budget=self.SETTLE_BUDGET):
+            self._complete, self._background = self._background, None
+        if self._settle(entry, self.part_nodes[source_part], self.SETTLE_BUDGET):
+            return entry[0]
+        if self._complete in self._fields and self._complete != source_part:
+            return self._fields[self._complete][0]
+        self._settle(entry)
+        self._complete = part
+        return entry[0]
+
+    def next_step(self, start, goal):
+        """Return the next cell on the way from start to goal, or None"""
+        width = self.width
+        source, target = start[1] * width + start[0], goal[1] * width + goal[0]
+        if source == target or not self.is_open[source] or not self.is_open[target]:
+            return None
+        if self.part[source] == self.part[target]:
+            dist, parent = self._local_bfs(target)
+            for dx, dy in self.NEIGHBOR_OFFSETS:
+                nxt = (start[1] + dy) * width + start[0] + dx
+                if dist.get(nxt, -1) == dist[source] - 1:
+                    return nxt % width, nxt // width
+            return None
+        nodes = self.part_nodes[self.part[source]]
+        field = self._field(self.part[target], self.part[source])
+        dist, parent = self._local_bfs(source)
+        best, best_cost = None, float('inf')
+        for node in nodes:
+            cost = dist[self.node_cells[node]] + field[node]
+            if cost < best_cost:
+                best, best_cost = node, cost
+        if best is None:
+            return None
+        cell = self.node_cells[best]
+        if cell == source:
+            for other, cost in self.edges[best]:
+                if cost + field[other] == field[best]:
+                    cell = self.node_cells[other]
+                    break
+            if cell not in parent:
+                return cell % width, cell // width
+        while parent[cell] != source:
+            cell = parent[cell]
+        return cell % width, cell // width
@@ -1,38 +1,43 @@
 """Game controller class"""
 import tkinter as tk
 import turtle
-import copy
-import time
 import os
 from datetime import datetime
-from maze_layout import LAYOUTS
-from PacMan import PacMan
-from Ghost import Ghost
 from StatisticsManager import StatisticsManager
-from Maze import Maze
+from Ghost import Ghost
+from GameEngine import GameEngine, DIFFICULTY_SETTINGS
+from MazeRenderer import MazeRenderer
+from SpritePool import SpritePool
+from TickScheduler import TickScheduler
+from TickProfiler import TickProfiler
+from ReplayLog import ReplayLog
 
-DIFFICULTY_SETTINGS = {
-    "easy": {"ghost_count": 2, "ghost_speed": 4, "power_duration": 100},
-    "normal": {"ghost_count": 3, "ghost_speed": 3, "power_duration": 60},
-    "hard": {"ghost_count": 4, "ghost_speed": 3, "power_duration": 40},
-}
+TICK_RATE = 10
+REPLAY_DIR = 'replays'
 
 
 class GameController:
     """Manages game state"""
 
-    def __init__(self, status_writer):
+    def __init__(self, status_writer, profile=False):
         self.game_state = 'menu'
         self.score = 0
-        self.timer = 0
         self.game_mode = 'easy'
         self.stats_manager = StatisticsManager()
         self.status_writer = status_writer
         self.status_message = None
+        self.status_text = None
+        self.engine = None
         self.maze = None
         self.pacman = None
         self.ghosts = []
         self.drawer = None
+        self.renderer = MazeRenderer()
+        self.sprites = SpritePool()
+        self.scheduler = None
+        self.profiler = TickProfiler() if profile else None
+        self.recorder = None
+        self.timestamps_start = 0
         self.first_move_done = False
         self.btn_style = {
             "font": ("Arial", 16, "bold"),
@@ -72,6 +77,7 @@ class GameController:
 
     def on_quit(self):
         """Handle quit button click"""
+        self.stats_manager.close()
         os._exit(0)
 
     def show_main_menu(self):
@@ -95,7 +101,7 @@ class GameController:
         diff_root.destroy()
         self.start_game(difficulty)
         self.setup_controls(self.screen)
-        self.update_game_state(self.screen)
+        self.start_loop(self.screen)
 
     def go_back_to_main(self, diff_root):
         """Go back to main menu"""
@@ -119,33 +125,38 @@ class GameController:
         diff_root.mainloop()
 
     def update_status(self, score, lives, timer):
-        """Function for update status when play game"""
+        """Function for update status when play game, redrawn only when the text changes"""
+        text = f"Score: {score}    Lives: {lives}    Time: {timer}s"
+        if text == self.status_text:
+            return
         try:
             if hasattr(self.status_writer.screen, 'cv') and \
             self.status_writer.screen.cv.winfo_exists():
                 self.status_writer.clear()
                 self.status_writer.goto(-230, 260)
-                self.status_writer.write(
-                    f"Score: {score}    Lives: {lives}    Time: {timer}s",
-                    font=("Arial", 16, "bold"))
+                self.status_writer.write(text, font=("Arial", 16, "bold"))
+                self.status_text = text
         except (turtle.TurtleGraphicsError, Exception):
             pass
 
     def game_over_screen(self, win=True):
         """Make 'game over' text appear on screen"""
+        msg = "YOU WIN!" if win else "GAME OVER"
+        self.show_message(f"{msg}\nPress R to Restart\nPress Q for Main Menu")
+
+    def show_message(self, text):
+        """Show a message in the middle of the screen"""
         self.clear_status_message()
-        self.status_message = turtle.Turtle()
+        self.status_message = self.sprites.acquire('message', turtle.Turtle)
         self.status_message.hideturtle()
         self.status_message.color("white")
         self.status_message.penup()
         self.status_message.goto(0, 0)
-        msg = "YOU WIN!" if win else "GAME OVER"
         try:
             if hasattr(self.status_message.screen, 'cv') and \
             self.status_message.screen.cv.winfo_exists():
                 self.status_message.write(
-                    f"{msg}\nPress R to Restart\nPress Q for Main Menu",
-                    align="center", font=("Arial", 30, "bold"))
+                    text, align="center", font=("Arial", 30, "bold"))
         except (turtle.TurtleGraphicsError, Exception):
             pass
 
@@ -155,8 +166,7 @@ class GameController:
             try:
                 if hasattr(self.status_message.screen, 'cv') and \
                 self.status_message.screen.cv.winfo_exists():
-                    self.status_message.clear()
-                    self.status_message.hideturtle()
+                    self.sprites.release(self.status_message)
             except (turtle.TurtleGraphicsError, Exception):
                 pass
             self.status_message = None
@@ -165,53 +175,53 @@ class GameController:
         """Start the game"""
         self.game_state = 'running'
         self.game_mode = difficulty
-        self.timer = 0
         self.first_move_done = False
-        self.maze = Maze(difficulty)
-        self.maze.layout = copy.deepcopy(LAYOUTS[difficulty])
+        self.status_text = None
         self.screen = turtle.Screen()
         self.screen.bgcolor("black")
         self.screen.tracer(0)
-        self.drawer = turtle.Turtle()
-        self.drawer.shape('square')
-        self.drawer.penup()
-        self.drawer.speed(0)
-        self.maze.load_maze(self.drawer)
-        self.pacman = PacMan(self.maze, DIFFICULTY_SETTINGS[difficulty])
-        self.ghosts = []
-        ghost_count = DIFFICULTY_SETTINGS[difficulty]["ghost_count"]
-        colors = ['red', 'cyan', 'orange', 'pink']
-        spawns = self.maze.ghost_spawns
-        for i in range(ghost_count):
-            spawn = spawns[i % len(spawns)]
-            ghost = Ghost(self.maze, colors[i % len(colors)], spawn=spawn)
-            self.ghosts.append(ghost)
+        self.finish_recording()
+        self.clear_status_message()
+        if self.engine:
+            self.engine.release_sprites()
+        self.engine = GameEngine(difficulty, render=True, sprites=self.sprites)
+        self.engine.profiler = self.profiler
+        self.recorder = ReplayLog.for_engine(self.engine)
+        self.timestamps_start = len(self.stats_manager.timestamps)
+        self.maze = self.engine.maze
+        self.pacman = self.engine.pacman
+        self.ghosts = self.engine.ghosts
+        self.drawer = self.renderer.draw(self.maze, difficulty)
         self.screen.update()
 
     def setup_controls(self, screen):
         """Setup controls for the game"""
         def record_first_move():
             if not self.first_move_done:
-                self.stats_manager.record_timestamp(datetime.now().isoformat(), self.pacman)
+                self.record_timestamp()
                 self.stats_manager.record_data(self.pacman, 0, self.game_mode)
                 self.stats_manager.save_to_file()
                 self.first_move_done = True
 
-        def move_up():
-            self.pacman.move(0, -1, self.drawer)
+        def move(action):
+            if self.scheduler and self.scheduler.paused:
+                return
+            if self.recorder and self.game_state == 'running':
+                self.recorder.record_input(self.engine.tick_count, action)
+            self.engine.move_pacman(action, self.drawer)
             record_first_move()
 
+        def move_up():
+            move('up')
+
         def move_down():
-            self.pacman.move(0, 1, self.drawer)
-            record_first_move()
+            move('down')
 
         def move_left():
-            self.pacman.move(-1, 0, self.drawer)
-            record_first_move()
+            move('left')
 
         def move_right():
-            self.pacman.move(1, 0, self.drawer)
-            record_first_move()
+            move('right')
 
         screen.listen()
         screen.onkeypress(move_up, "Up")
@@ -220,62 +230,118 @@ class GameController:
         screen.onkeypress(move_right, "Right")
         screen.onkeypress(lambda: self.restart(screen), "r")
         screen.onkeypress(lambda: self.quit_to_main(screen), "q")
+        screen.onkeypress(self.toggle_pause, "p")
+        screen.onkeypress(self.dump_profile, "t")
+
+    def start_loop(self, screen):
+        """Start the fixed-rate game loop, replacing any previous one"""
+        if self.scheduler:
+            self.scheduler.stop()
+        self.scheduler = TickScheduler(screen, lambda: self.update_game_state(screen),
+                                       rate=TICK_RATE)
+        self.scheduler.start()
+
+    def toggle_pause(self):
+        """Pause or resume the running game"""
+        if self.game_state != 'running' or not self.scheduler:
+            return
+        self.scheduler.toggle_pause()
+        if self.scheduler.paused:
+            self.show_message("PAUSED\nPress P to Resume")
+        else:
+            self.clear_status_message()
+
+    def dump_profile(self):
+        """Print the tick phase timings, switching profiling on if it was off"""
+        if self.profiler is None:
+            self.profiler = TickProfiler()
+            if self.engine:
+                self.engine.profiler = self.profiler
+            print("Tick profiling enabled; press T again for the timings")
+            return
+        print(self.profiler.report())
+
+    def record_timestamp(self):
+        """Record a statistics snapshot, logging its time for the replay"""
+        now = datetime.now()
+        if self.recorder:
+            self.recorder.record_snapshot(self.engine.tick_count, now)
+        self.stats_manager.record_timestamp(now.isoformat(), self.pacman)
+
+    def finish_recording(self):
+        """Save the current game's replay log to REPLAY_DIR"""
+        if self.recorder is None:
+            return
+        recorder, self.recorder = self.recorder, None
+        recorder.finish(self.engine, self.stats_manager.timestamps[self.timestamps_start:])
+        path = os.path.join(REPLAY_DIR,
+                            f"{datetime.now():%Y%m%d-%H%M%S-%f}-{self.game_mode}.pcr")
+        try:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            recorder.save(path)
+        except OSError as e:
+            print(f"Could not save replay: {e}")
 
     def check_win_condition(self):
         """Check if the game is won"""
-        return all(cell not in (1, 2) for row in self.maze.layout for cell in row)
+        return self.engine.check_win_condition()
 
     def update_game_state(self, screen):
-        """Main game loop"""
+        """Run one tick of the game loop; returns False once the game is over"""
         if self.game_state != 'running':
-            return
-
-        self.timer += 1
-        self.pacman.change_state()
-        self.update_status(self.pacman.score, self.pacman.lives, self.timer // 10)
-        if self.timer % DIFFICULTY_SETTINGS[self.game_mode]["ghost_speed"] == 0:
-            for ghost in self.ghosts:
-                ghost.move(self.pacman.x, self.pacman.y, self.pacman.state == "powered")
-        for ghost in self.ghosts:
-            if ghost.x == self.pacman.x and ghost.y == self.pacman.y:
-                if self.pacman.state == 'powered' and self.pacman.eat_ghost():
-                    ghost.respawn()
-                else:
-                    self.pacman.lives -= 1
-                    self.pacman.x, self.pacman.y = self.pacman.maze.pacman_start
-                    self.pacman.update_position()
-                    for g in self.ghosts:
-                        g.respawn()
-                    time.sleep(1)
+            return False
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+        timer = self.engine.timer
+        self.engine.tick()
+        advanced = self.engine.timer != timer
+        self.update_status(self.pacman.score, self.pacman.lives, self.engine.timer // 10)
+        if profiler is not None:
+            profiler.mark('hud')
+        powered = self.pacman.state == "powered"
+        color = Ghost.frightened_color(self.pacman.power_timer,
+                                       self.pacman.settings["power_duration"]) \
+            if powered else None
         for ghost in self.ghosts:
-            ghost.update_position(
-                powered=self.pacman.state == "powered",
-                power_timer=self.pacman.power_timer,
-                power_duration=self.pacman.settings["power_duration"]
-            )
-        if self.timer % 100 == 0:
-            self.stats_manager.record_timestamp(datetime.now().isoformat(), self.pacman)
-        if self.timer % 50 == 0:
-            self.stats_manager.record_data(self.pacman, self.timer // 10, self.game_mode)
+            ghost.update_position(powered=powered, color=color)
+        if profiler is not None:
+            profiler.mark('sprites')
+        if advanced and self.engine.timer % 100 == 0:
+            self.record_timestamp()
+        if advanced and self.engine.timer % 50 == 0:
+            self.stats_manager.record_data(self.pacman, self.engine.timer // 10, self.game_mode)
             self.stats_manager.save_to_file()
-        screen.update()
-        time.sleep(0.1)
-        if self.check_win_condition() or self.pacman.lives <= 0:
+        if profiler is not None:
+            profiler.mark('stats')
+        self.refresh_sprites(screen)
+        if profiler is not None:
+            profiler.mark('screen_update')
+            profiler.end()
+        if self.engine.game_state == 'game_over':
             self.game_state = 'game_over'
             self.clear_status_message()
-            self.stats_manager.record_timestamp(datetime.now().isoformat(), self.pacman)
-            self.stats_manager.record_data(self.pacman, self.timer // 10, self.game_mode)
-            self.stats_manager.save_to_file()
-            if self.check_win_condition():
-                self.game_over_screen(win=True)
-            else:
-                self.game_over_screen(win=False)
+            self.record_timestamp()
+            self.stats_manager.record_data(self.pacman, self.engine.timer // 10, self.game_mode)
+            self.stats_manager.save_to_file(final=True)
+            self.finish_recording()
+            self.game_over_screen(win=self.engine.won)
             print(self.stats_manager.generate_report())
+            print(self.scheduler.report())
+            if profiler is not None:
+                print(profiler.report())
             screen.onkeypress(self.restart, "r")
             screen.listen()
+        return self.game_state == 'running'
 
-        if self.game_state == 'running':
-            screen.ontimer(lambda: self.update_game_state(screen), 100)
+    def refresh_sprites(self, screen):
+        """Redraw the screen only if a sprite changed since the last frame"""
+        sprites = [self.pacman] + self.ghosts
+        if any(sprite.dirty for sprite in sprites):
+            screen.update()
+            for sprite in sprites:
+                sprite.dirty = False
 
     def restart(self, screen=None):
         """Restart the game"""
@@ -284,18 +350,26 @@ class GameController:
         try:
             for t in turtle.turtles():
                 t.hideturtle()
-                t.clear()
+                if not self.renderer.owns(t):
+                    t.clear()
         except turtle.TurtleGraphicsError:
             pass
         screen.bgcolor("black")
         screen.tracer(0)
         self.start_game(self.game_mode)
         self.setup_controls(screen)
-        self.update_game_state(screen)
+        self.start_loop(screen)
 
     def quit_to_main(self, screen):
         """Quit to main menu"""
+        if self.scheduler:
+            self.scheduler.stop()
+        self.finish_recording()
+        self.game_state = 'menu'
         screen.clearscreen()
+        self.renderer.invalidate()
+        self.sprites.invalidate()
+        self.status_message = None
         self.show_main_menu()
 
     def show_how_to_play(self):
@@ -313,6 +387,8 @@ class GameController:
             "- Eat a big dot (power pellet) to turn ghosts blue and"
             "chomp them for bonus points!\n"
             "- You start withonly have 3 lives.\n"
+            "- Press P to pause or resume.\n"
+            "- Press T to print tick timings to the console.\n"
             "- Press R to restart after game over.\n"
             "- Press Q to return to the main menu.\n\n\n"
             "DIFFICULTY LEVELS:\n\n"
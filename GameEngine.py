@@ -0,0 +1,171 @@
+"""Game engine class"""
+from Maze import Maze
+from PacMan import PacMan
+from Ghost import Ghost
+from GameState import GameState
+
+DIFFICULTY_SETTINGS = {
+    "easy": {"ghost_count": 2, "ghost_speed": 4, "power_duration": 100},
+    "normal": {"ghost_count": 3, "ghost_speed": 3, "power_duration": 60},
+    "hard": {"ghost_count": 4, "ghost_speed": 3, "power_duration": 40},
+}
+
+
+class GameEngine:
+    """Runs the game rules without a display, one tick per step
+
+    timer counts the ticks the game advanced; tick_count also counts the
+    ticks spent frozen after a lost life. Setting profiler to a
+    TickProfiler times the phases of each tick.
+    """
+    GHOST_COLORS = ['red', 'cyan', 'orange', 'pink']
+    ACTIONS = {
+        'up': (0, -1),
+        'down': (0, 1),
+        'left': (-1, 0),
+        'right': (1, 0)
+    }
+    RESPAWN_DELAY = 10
+
+    def __init__(self, difficulty='easy', render=False, layout=None, use_numpy=False,
+                 respawn_delay=None, settings=None, sprites=None):
+        """Initialize engine, creating turtle sprites only when render is True
+
+        A custom layout replaces the difficulty's bundled maze while keeping
+        its DIFFICULTY_SETTINGS; settings overrides some of those values.
+        After a lost life the game stays frozen for respawn_delay ticks
+        (RESPAWN_DELAY by default). With a SpritePool as sprites, rendered
+        icons are taken from it and given back on every reset.
+        """
+        self.difficulty = difficulty
+        self.settings = dict(DIFFICULTY_SETTINGS[difficulty], **(settings or {}))
+        self.render = render
+        self.layout = layout
+        self.use_numpy = use_numpy
+        self.respawn_delay = self.RESPAWN_DELAY if respawn_delay is None else respawn_delay
+        self.sprites = sprites
+        self.game_state = 'running'
+        self.freeze_ticks = 0
+        self.timer = 0
+        self.tick_count = 0
+        self.won = False
+        self.events = []
+        self.profiler = None
+        self.maze = None
+        self.pacman = None
+        self.ghosts = []
+        self.reset()
+
+    def reset(self):
+        """Reset maze, Pac-Man and ghosts to the start of a game"""
+        self.game_state = 'running'
+        self.freeze_ticks = 0
+        self.timer = 0
+        self.tick_count = 0
+        self.won = False
+        self.events = []
+        if self.maze is None:
+            self.maze = Maze(self.difficulty, layout=self.layout, use_numpy=self.use_numpy)
+        else:
+            self.maze.reset()
+        self.release_sprites()
+        self.pacman = PacMan(self.maze, self.settings, render=self.render, sprites=self.sprites)
+        self.ghosts = []
+        spawns = self.maze.ghost_spawns
+        for i in range(self.settings["ghost_count"]):
+            spawn = spawns[i % len(spawns)]
+            color = self.GHOST_COLORS[i % len(self.GHOST_COLORS)]
+            self.ghosts.append(Ghost(self.maze, color, spawn=spawn, render=self.render,
+                                     sprites=self.sprites))
+
+    def release_sprites(self):
+        """Give Pac-Man's and the ghosts' icons back to the sprite pool"""
+        if self.sprites is None:
+            return
+        for sprite in [self.pacman] + self.ghosts:
+            if sprite is not None and sprite.icon is not None:
+                self.sprites.release(sprite.icon)
+                sprite.icon = None
+
+    def snapshot(self):
+        """Return a GameState copy of the current game"""
+        return GameState.capture(self)
+
+    def restore(self, state):
+        """Return the game to a GameState taken from this engine"""
+        state.restore(self)
+
+    def state_hash(self):
+        """Return a Zobrist hash of the pellets, positions and power timer
+
+        Equal states hash equally across engines, runs and processes, so it
+        keys transposition tables; lives, score and timers are left out.
+        """
+        pacman = self.pacman
+        power_timer = pacman.power_timer if pacman.state == PacMan.POWERED_STATE else 0
+        return self.maze.pellet_board().state_hash(
+            (pacman.x, pacman.y), [(ghost.x, ghost.y) for ghost in self.ghosts], power_timer)
+
+    def move_pacman(self, action, drawer=None):
+        """Move Pac-Man by an action name or (dx, dy) pair, unless frozen"""
+        if self.game_state != 'running' or self.freeze_ticks or action is None:
+            return
+        dx, dy = self.ACTIONS.get(action, action)
+        self.pacman.move(dx, dy, drawer)
+
+    def check_win_condition(self):
+        """Check if the game is won"""
+        return self.maze.pellets_remaining == 0
+
+    def tick(self):
+        """Advance the game by one tick and return the events it produced"""
+        self.events = []
+        if self.game_state != 'running':
+            return self.events
+        self.tick_count += 1
+        if self.freeze_ticks:
+            self.freeze_ticks -= 1
+            return self.events
+
+        profiler = self.profiler
+        self.timer += 1
+        self.pacman.change_state()
+        if profiler is not None:
+            profiler.mark('power_timer')
+        powered = self.pacman.state == PacMan.POWERED_STATE
+        if self.timer % self.settings["ghost_speed"] == 0:
+            flow = not powered and self.maze.uses_flow_field()
+            if flow:
+                self.maze.flow_field(self.pacman.x, self.pacman.y,
+                                     [(ghost.x, ghost.y) for ghost in self.ghosts])
+            for ghost in self.ghosts:
+                ghost.move(self.pacman.x, self.pacman.y, powered, flow)
+        if profiler is not None:
+            profiler.mark('ghost_ai')
+        for ghost in self.ghosts:
+            if ghost.x == self.pacman.x and ghost.y == self.pacman.y:
+                if self.pacman.state == PacMan.POWERED_STATE and self.pacman.eat_ghost():
+                    ghost.respawn()
+                    self.events.append('ghost_eaten')
+                else:
+                    self.pacman.lives -= 1
+                    self.pacman.x, self.pacman.y = self.maze.pacman_start
+                    self.pacman.update_position()
+                    for g in self.ghosts:
+                        g.respawn()
+                    self.freeze_ticks = self.respawn_delay
+                    self.events.append('life_lost')
+
+        if self.check_win_condition() or self.pacman.lives <= 0:
+            self.game_state = 'game_over'
+            self.won = self.check_win_condition()
+            self.events.append('game_over')
+        if profiler is not None:
+            profiler.mark('collisions')
+        return self.events
+
+    def step(self, action=None):
+        """Apply an optional Pac-Man action, then advance one tick"""
+        self.move_pacman(action)
+        self.tick()
+        return self.game_state
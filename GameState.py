@@ -0,0 +1,70 @@
+"""Game state class"""
+from operator import attrgetter
+
+
+class GameState:
+    """Immutable copy of everything a game tick reads or changes
+
+    Positions, lives, score, power timer and counters are kept as tuples and
+    the pellet grid as bytes, never a turtle, so capturing and restoring
+    a state takes microseconds on the bundled mazes. When the maze has a
+    pellet board, its bitsets are kept as well. A state can be restored
+    any number of times, into the engine it came from or into another engine
+    on the same maze. Restoring leaves sprites where they are; they follow on
+    the next update_position.
+    """
+    __slots__ = ('game_state', 'won', 'timer', 'tick_count', 'freeze_ticks', 'pacman',
+                 'ghosts', 'pellets', 'pellet_counts', 'pellet_bits')
+    PACMAN_FIELDS = ('x', 'y', 'state', 'power_timer', 'lives', 'score', 'dots_collected',
+                     'ghosts_eaten', 'power_pallets_collected')
+    _pacman_fields = attrgetter(*PACMAN_FIELDS)
+
+    def __init__(self, game_state, won, timer, tick_count, freeze_ticks, pacman, ghosts,
+                 pellets, pellet_counts, pellet_bits=None):
+        self.game_state = game_state
+        self.won = won
+        self.timer = timer
+        self.tick_count = tick_count
+        self.freeze_ticks = freeze_ticks
+        self.pacman = pacman
+        self.ghosts = ghosts
+        self.pellets = pellets
+        self.pellet_counts = pellet_counts
+        self.pellet_bits = pellet_bits
+
+    @classmethod
+    def capture(cls, engine):
+        """Copy an engine's current state"""
+        maze = engine.maze
+        return cls(engine.game_state, engine.won, engine.timer, engine.tick_count,
+                   engine.freeze_ticks, cls._pacman_fields(engine.pacman),
+                   tuple((ghost.x, ghost.y) for ghost in engine.ghosts), maze.pellet_state(),
+                   (maze.dots_remaining, maze.power_pellets_remaining), maze.pellet_bits())
+
+    def restore(self, engine):
+        """Put an engine back into this state"""
+        engine.game_state = self.game_state
+        engine.won = self.won
+        engine.timer = self.timer
+        engine.tick_count = self.tick_count
+        engine.freeze_ticks = self.freeze_ticks
+        engine.events = []
+        pacman = engine.pacman
+        (pacman.x, pacman.y, pacman.state, pacman.power_timer, pacman.lives, pacman.score,
+         pacman.dots_collected, pacman.ghosts_eaten, pacman.power_pallets_collected) = self.pacman
+        for ghost, (x, y) in zip(engine.ghosts, self.ghosts):
+            ghost.x, ghost.y = x, y
+        engine.maze.restore_pellets(self.pellets, *self.pellet_counts, bits=self.pellet_bits)
+
+    def _key(self):
+        """Every field, for comparison and hashing"""
+        return (self.game_state, self.won, self.timer, self.tick_count, self.freeze_ticks,
+                self.pacman, self.ghosts, self.pellets, self.pellet_counts)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
@@ -1,5 +1,4 @@
 """Ghost class"""
-import turtle
 import heapq
 
 
@@ -15,6 +14,7 @@ class Ghost:
     @staticmethod
     def register_ghost_shape(color):
         """Register a custom ghost shape for the given color if not already registered."""
+        import turtle
         shape_name = f"ghost_{color}"
         screen = turtle.Screen()
         if shape_name in screen.getshapes():
@@ -29,24 +29,37 @@ class Ghost:
         screen.register_shape(shape_name, poly)
         return shape_name
 
-    def __init__(self, maze, color='red', spawn=None):
-        """Initialize ghost with color and spawn point"""
+    def __init__(self, maze, color='red', spawn=None, render=True, sprites=None):
+        """Initialize ghost with color and spawn point, without an icon when render is False
+
+        The icon comes from the sprites pool when one is given.
+        """
         self.maze = maze
         self.start = spawn or maze.ghost_spawns[0]
         self.x, self.y = self.start
         self.original_color = color
-        self.shape_name = Ghost.register_ghost_shape(color)
-        self.icon = turtle.Turtle()
-        self.icon.shape(self.shape_name)
-        self.icon.color(self.GHOST_COLORS[self.original_color])
-        self.icon.penup()
-        self.icon.speed(0)
+        self.shape_name = f"ghost_{color}"
+        self.icon = None
+        self.rendered_pos = None
+        self.rendered_color = None
+        self.dirty = False
+        if render:
+            import turtle
+            self.shape_name = Ghost.register_ghost_shape(color)
+            self.icon = sprites.acquire('ghost', turtle.Turtle) if sprites else turtle.Turtle()
+            self.icon.shape(self.shape_name)
+            self.icon.color(self.GHOST_COLORS[self.original_color])
+            self.icon.penup()
+            self.icon.speed(0)
+            self.icon.showturtle()
+            self.rendered_color = self.GHOST_COLORS[self.original_color]
         self.animation_frame = 0
         self.animation_direction = 1
         self.update_position()
 
     def _register_ghost_shape(self):
         """Create custom ghost shape"""
+        import turtle
         if self.shape_name not in turtle.getshapes():
             ghost = turtle.Turtle()
             ghost.hideturtle()
@@ -59,12 +72,17 @@ class Ghost:
 
     def _setup_icon(self):
         """Setup ghost's turtle icon"""
+        import turtle
         self.icon = turtle.Turtle()
         self.icon.shape(self.shape_name)
         self.icon.penup()
         self.icon.speed(0)
         self.update_position()
 
+    def flee_target(self, target_x, target_y):
+        """Find the walkable cell furthest (Manhattan) from the target"""
+        return self.maze.farthest_cell(target_x, target_y)
+
     def pathfinding(self, target_x, target_y, powered=False):
         """A* pathfinding algorithm to find path to target"""
         def heuristic(a, b):
@@ -80,24 +98,7 @@ class Ghost:
             return neighbors
 
         start = (self.x, self.y)
-        if powered:
-            valid_positions = []
-            for y in range(len(self.maze.layout)):
-                for x in range(len(self.maze.layout[0])):
-                    if not self.maze.check_collision(x, y):
-                        valid_positions.append((x, y))
-
-            max_distance = -1
-            furthest_pos = None
-            for pos in valid_positions:
-                dist = heuristic(pos, (target_x, target_y))
-                if dist > max_distance:
-                    max_distance = dist
-                    furthest_pos = pos
-
-            goal = furthest_pos
-        else:
-            goal = (target_x, target_y)
+        goal = self.flee_target(target_x, target_y) if powered else (target_x, target_y)
 
         frontier = []
         heapq.heappush(frontier, (0, start))
@@ -127,41 +128,68 @@ class Ghost:
         path.reverse()
         return path
 
-    def move(self, tx, ty, powered):
-        """Move ghost towards target position"""
-        if powered:
-            self.icon.color('blue')
-        else:
-            self.icon.color(self.GHOST_COLORS[self.original_color])
+    def move(self, tx, ty, powered, flow=False):
+        """Move ghost towards target position
 
-        path = self.pathfinding(tx, ty, powered)
-        if path:
-            next_x, next_y = path[0]
-            self.x, self.y = next_x, next_y
-            self.update_position()
+        With flow the ghost steps downhill on the maze's shared flow field,
+        which the caller has prepared for (tx, ty).
+        """
+        if flow and not powered:
+            next_pos = self.maze.flow_step(self.x, self.y)
+        else:
+            goal = self.flee_target(tx, ty) if powered else (tx, ty)
+            if self.maze.next_hops is None:
+                next_pos = self.maze.hierarchy().next_step((self.x, self.y), goal)
+            else:
+                next_pos = self.maze.next_step((self.x, self.y), goal)
+        if next_pos:
+            self.x, self.y = next_pos
+            self._place()
 
-    def update_position(self, powered=False, power_timer=None, power_duration=None):
-        """Update ghost's position on screen"""
+    @staticmethod
+    def frightened_color(power_timer=None, power_duration=None):
+        """Colour of frightened ghosts, blinking white near the end of the power-up"""
+        if power_timer is not None and power_duration is not None and \
+        power_timer < 0.2 * power_duration and (power_timer // 2) % 2 != 0:
+            return 'white'
+        return '#0000FF'
+
+    def _place(self):
+        """Move the icon to the ghost's cell if it is not already there"""
+        if self.icon is None:
+            return
         TILE_SIZE = 24
 
-        sx = -252 + (self.x * TILE_SIZE)
-        sy = 252 - (self.y * TILE_SIZE)
-        self.icon.goto(sx + TILE_SIZE // 2, sy - TILE_SIZE // 2)
-        self.icon.shape(self.shape_name)
-        if powered:
-            if power_timer is not None and power_duration is not None and \
-            power_timer < 0.2 * power_duration:
-                if (power_timer // 2) % 2 == 0:
-                    self.icon.color('#0000FF')
-                else:
-                    self.icon.color('white')
+        sx = -252 + (self.x * TILE_SIZE) + TILE_SIZE // 2
+        sy = 252 - (self.y * TILE_SIZE) - TILE_SIZE // 2
+        if (sx, sy) != self.rendered_pos:
+            self.icon.goto(sx, sy)
+            self.rendered_pos = (sx, sy)
+            self.dirty = True
+
+    def update_position(self, powered=False, power_timer=None, power_duration=None,
+                        color=None):
+        """Update ghost's position on screen, touching the icon only on change
+
+        A precomputed color skips the per-ghost frightened colour check.
+        """
+        if self.icon is None:
+            return
+        if color is None:
+            if powered:
+                color = Ghost.frightened_color(power_timer, power_duration)
             else:
-                self.icon.color('#0000FF')
-        else:
-            self.icon.color(self.GHOST_COLORS[self.original_color])
-        self.icon.showturtle()
+                color = self.GHOST_COLORS[self.original_color]
+        self._place()
+        if color != self.rendered_color:
+            self.icon.color(color)
+            self.rendered_color = color
+            self.dirty = True
+        if not self.icon.isvisible():
+            self.icon.showturtle()
+            self.dirty = True
 
     def respawn(self):
-        """Return ghost to spawn point"""
+        """Return ghost to spawn point; the caller's next update_position sets its colour"""
         self.x, self.y = self.start
-        self.update_position()
+        self._place()
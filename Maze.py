@@ -1,5 +1,24 @@
 """Maze class"""
+import hashlib
+import heapq
+from collections import deque
 from maze_layout import LAYOUTS
+from ClusterPathfinder import ClusterPathfinder
+from PelletBoard import PelletBoard
+
+np = None
+
+
+def _load_numpy():
+    """Import numpy on first use, since only use_numpy mazes need it; False if missing"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
 
 
 class Maze:
@@ -7,59 +26,545 @@ class Maze:
     TILE_SIZE = 24
     MAZE_OFFSET_X = -252
     MAZE_OFFSET_Y = 252
+    NEIGHBOR_OFFSETS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+    FLEE_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+    PATH_TABLE_LIMIT = 1200
+    PATH_TABLE_CACHE_SIZE = 8
+    FLOW_FIELD_LIMIT = 250000
+    _path_tables = {}
+    _hierarchies = {}
+
+    def __init__(self, difficulty="easy", layout=None, use_numpy=False):
+        """Initialize maze with difficulty level, or from an explicit layout
 
-    def __init__(self, difficulty="easy"):
-        """Initialize maze with difficulty level"""
-        self.layout = LAYOUTS[difficulty]
+        With use_numpy the grid is a uint8 array with a precomputed walkability
+        mask, so very large mazes load, reset and answer queries in bulk.
+        """
+        if use_numpy and not _load_numpy():
+            raise ImportError("Maze(use_numpy=True) requires numpy")
+        self.use_numpy = use_numpy
+        source = LAYOUTS[difficulty] if layout is None else layout
+        if use_numpy:
+            self._initial = np.array(source, dtype=np.uint8)
+            self.grid = self._initial.copy()
+            self.layout = self.grid
+            self.walkable = self._initial != 0
+        else:
+            self._initial = [list(row) for row in source]
+            self.grid = None
+            self.layout = [row[:] for row in self._initial]
+            self.walkable = None
+        self.height = len(self.layout)
+        self.width = len(self.layout[0]) if self.height else 0
+        self.dots_remaining = 0
+        self.power_pellets_remaining = 0
+        self._count_pellets()
+        self._initial_counts = (self.dots_remaining, self.power_pellets_remaining)
         self.pacman_start = self._find_pacman_start()
         self.ghost_spawns = self._find_ghost_spawns()
+        self.cells = []
+        self.cell_index = {}
+        self.neighbors = []
+        self.distances = None
+        self.next_hops = None
+        self._walls_key = None
+        self._hierarchy = None
+        self._build_path_tables()
+        self.flee_extremes = []
+        self.flee_targets = []
+        self._build_flee_table()
+        self.open_count = self.walkable_count()
+        self._open = None
+        self._field = None
+        self._field_key = None
+        self._field_queue = None
+        self._board = None
+
+    def reset(self):
+        """Put every pellet back, reusing the walls and path tables"""
+        if self.use_numpy:
+            np.copyto(self.grid, self._initial)
+        else:
+            self.layout = [row[:] for row in self._initial]
+        self.dots_remaining, self.power_pellets_remaining = self._initial_counts
+        if self._board is not None:
+            self._board.reset()
+
+    def layout_hash(self):
+        """Return a short digest of the starting layout and its size"""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{self.width}x{self.height}".encode())
+        if self.use_numpy:
+            digest.update(self._initial.tobytes())
+        else:
+            for row in self._initial:
+                digest.update(bytes(row))
+        return digest.digest()
+
+    def walkable_count(self):
+        """Return the number of non-wall cells"""
+        if self.use_numpy:
+            return int(np.count_nonzero(self.walkable))
+        return sum(len(row) - row.count(0) for row in self._initial)
+
+    def _walkable_graph(self):
+        """Return walkable cells in row-major order and their neighbour lists"""
+        if self.use_numpy:
+            ys, xs = np.nonzero(self.walkable)
+            cells = list(zip(xs.tolist(), ys.tolist()))
+            index = np.full((self.height + 2, self.width + 2), -1, dtype=np.int64)
+            index[ys + 1, xs + 1] = np.arange(len(cells))
+            columns = [index[ys + 1 + dy, xs + 1 + dx].tolist()
+                       for dx, dy in self.NEIGHBOR_OFFSETS]
+            neighbors = [[n for n in row if n >= 0] for row in zip(*columns)]
+            return cells, neighbors
+        cells = [(x, y) for y, row in enumerate(self._initial)
+                 for x, cell in enumerate(row) if cell != 0]
+        cell_index = {pos: i for i, pos in enumerate(cells)}
+        neighbors = [[cell_index[(x + dx, y + dy)] for dx, dy in self.NEIGHBOR_OFFSETS
+                      if (x + dx, y + dy) in cell_index] for x, y in cells]
+        return cells, neighbors
+
+    def _build_path_tables(self):
+        """Build all-pairs distance and next-hop tables over walkable cells
+
+        Walls never change during a game, so the tables are shared by every
+        maze with the same walls. Mazes with more than PATH_TABLE_LIMIT
+        walkable cells get no tables.
+        """
+        if self.use_numpy:
+            key = (self.walkable.shape, self.walkable.tobytes())
+        else:
+            key = tuple(tuple(cell == 0 for cell in row) for row in self._initial)
+        self._walls_key = key
+        cached = Maze._path_tables.get(key)
+        if cached is None:
+            cells, cell_index, neighbors, distances, next_hops = [], {}, [], None, None
+            if self.walkable_count() <= self.PATH_TABLE_LIMIT:
+                cells, neighbors = self._walkable_graph()
+                cell_index = {pos: i for i, pos in enumerate(cells)}
+                distances = [self._bfs(neighbors, i) for i in range(len(cells))]
+                next_hops = [self._first_hops(neighbors, distances, i)
+                             for i in range(len(cells))]
+            cached = (cells, cell_index, neighbors, distances, next_hops)
+            if len(Maze._path_tables) >= self.PATH_TABLE_CACHE_SIZE:
+                Maze._path_tables.pop(next(iter(Maze._path_tables)))
+            Maze._path_tables[key] = cached
+        self.cells, self.cell_index, self.neighbors, self.distances, self.next_hops = cached
+
+    def _build_flee_table(self):
+        """Index the walkable cell furthest (Manhattan) from each walkable cell
+
+        The furthest cell always maximises one of x+y, x-y, -x+y or -x-y, so
+        only the first cell (in row-major order) reaching each extreme is kept.
+        """
+        self.flee_extremes = []
+        if self.use_numpy:
+            ys, xs = np.nonzero(self.walkable)
+            if len(xs):
+                for sx, sy in self.FLEE_DIRECTIONS:
+                    values = sx * xs + sy * ys
+                    first = int(np.argmax(values))
+                    self.flee_extremes.append(
+                        (sx, sy, int(values[first]), (int(xs[first]), int(ys[first]))))
+        else:
+            for sx, sy in self.FLEE_DIRECTIONS:
+                best, first = None, None
+                for y, row in enumerate(self._initial):
+                    for x, cell in enumerate(row):
+                        if cell != 0 and (best is None or sx * x + sy * y > best):
+                            best, first = sx * x + sy * y, (x, y)
+                if first is not None:
+                    self.flee_extremes.append((sx, sy, best, first))
+        self.flee_targets = [self._furthest(x, y) for x, y in self.cells]
+
+    def _furthest(self, target_x, target_y):
+        """Return the first walkable cell (row-major) furthest from the target"""
+        max_distance, furthest = None, None
+        for sx, sy, best, first in self.flee_extremes:
+            dist = best - sx * target_x - sy * target_y
+            if furthest is None or dist > max_distance or \
+                    (dist == max_distance and first[::-1] < furthest[::-1]):
+                max_distance, furthest = dist, first
+        return furthest
+
+    def farthest_cell(self, target_x, target_y):
+        """Return the walkable cell furthest (Manhattan) from the target"""
+        target = self.cell_index.get((target_x, target_y))
+        if target is None:
+            return self._furthest(target_x, target_y)
+        return self.flee_targets[target]
+
+    @staticmethod
+    def _bfs(neighbors, source):
+        """Breadth-first distances from one cell to every cell (-1 if unreachable)"""
+        dist = [-1] * len(neighbors)
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            step = dist[current] + 1
+            for nxt in neighbors[current]:
+                if dist[nxt] < 0:
+                    dist[nxt] = step
+                    queue.append(nxt)
+        return dist
+
+    @staticmethod
+    def _first_hops(neighbors, distances, source):
+        """Next cell from source towards every goal
+
+        Entries are -1 when there is no move and None when several neighbours
+        lie on a shortest path; those are resolved on first use.
+        """
+        hops = [-1] * len(neighbors)
+        for goal, goal_dist in enumerate(distances):
+            need = goal_dist[source] - 1
+            if need < 0:
+                continue
+            hop = -1
+            for nxt in neighbors[source]:
+                if goal_dist[nxt] == need:
+                    if hop >= 0:
+                        hop = None
+                        break
+                    hop = nxt
+            hops[goal] = hop
+        return hops
+
+    def _search_first_hop(self, source, goal):
+        """Resolve a tied next hop the same way Ghost.pathfinding's A* does"""
+        start, target = self.cells[source], self.cells[goal]
+        tx, ty = target
+        frontier = [(0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        while frontier:
+            current = heapq.heappop(frontier)[1]
+            if current == target:
+                break
+            new_cost = cost_so_far[current] + 1
+            for nxt in self.neighbors[self.cell_index[current]]:
+                pos = self.cells[nxt]
+                if pos not in cost_so_far or new_cost < cost_so_far[pos]:
+                    cost_so_far[pos] = new_cost
+                    came_from[pos] = current
+                    heapq.heappush(frontier, (new_cost + abs(tx - pos[0]) + abs(ty - pos[1]), pos))
+        current = target
+        while came_from[current] != start:
+            current = came_from[current]
+        return self.cell_index[current]
+
+    def _open_cells(self):
+        """Row-major walkability of every cell as a flat list"""
+        if self._open is None:
+            if self.use_numpy:
+                self._open = self.walkable.ravel().tolist()
+            else:
+                self._open = [cell != 0 for row in self._initial for cell in row]
+        return self._open
+
+    def hierarchy(self):
+        """Return the cluster pathfinder for this maze's walls, building it on first use
+
+        Like the path tables it is shared by every maze with the same walls.
+        """
+        if self._hierarchy is None:
+            pathfinder = Maze._hierarchies.get(self._walls_key)
+            if pathfinder is None:
+                pathfinder = ClusterPathfinder(self.width, self.height, self._open_cells())
+                if len(Maze._hierarchies) >= self.PATH_TABLE_CACHE_SIZE:
+                    Maze._hierarchies.pop(next(iter(Maze._hierarchies)))
+                Maze._hierarchies[self._walls_key] = pathfinder
+            self._hierarchy = pathfinder
+        return self._hierarchy
+
+    def uses_flow_field(self):
+        """True when chasing ghosts should share a flow field instead of searching
+
+        Small mazes answer next_step from their path tables; very large ones
+        would spend too long filling the field.
+        """
+        return self.next_hops is None and self.open_count <= self.FLOW_FIELD_LIMIT
+
+    def flow_field(self, target_x, target_y, cells=()):
+        """Prepare the shared BFS distance field towards a target
+
+        The field is kept while the target stays put. The search only runs
+        until every given cell has a distance, and resumes from where it
+        stopped when a later call needs cells further out.
+        """
+        self._open_cells()
+        width = self.width
+        if self._field_key != (target_x, target_y):
+            self._field_key = (target_x, target_y)
+            self._field = [-1] * (width * self.height)
+            self._field_queue = deque()
+            if 0 <= target_x < width and 0 <= target_y < self.height:
+                start = target_y * width + target_x
+                if self._open[start]:
+                    self._field[start] = 0
+                    self._field_queue.append(start)
+        field = self._field
+        need = {y * width + x for x, y in cells
+                if 0 <= x < width and 0 <= y < self.height and field[y * width + x] < 0}
+        if need:
+            self._expand_field(need)
+
+    def _expand_field(self, need):
+        """Continue the field's breadth-first search until every needed cell is reached"""
+        field, queue, is_open = self._field, self._field_queue, self._open
+        width, size = self.width, len(self._field)
+        while queue and need:
+            current = queue.popleft()
+            step = field[current] + 1
+            x = current % width
+            for nxt in (current + width, current + 1, current - width, current - 1):
+                if nxt < 0 or nxt >= size or (nxt == current + 1 and x == width - 1) or \
+                        (nxt == current - 1 and x == 0):
+                    continue
+                if is_open[nxt] and field[nxt] < 0:
+                    field[nxt] = step
+                    queue.append(nxt)
+                    need.discard(nxt)
+
+    def flow_step(self, x, y):
+        """Next cell downhill on the flow field from (x, y), or None"""
+        width = self.width
+        dist = self._field[y * width + x]
+        if dist <= 0:
+            return None
+        for dx, dy in self.NEIGHBOR_OFFSETS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < self.height and \
+                    self._field[ny * width + nx] == dist - 1:
+                return nx, ny
+        return None
+
+    def next_step(self, start, goal):
+        """Return the next cell on the path from start to goal, or None"""
+        source = self.cell_index.get(start)
+        target = self.cell_index.get(goal)
+        if source is None or target is None:
+            return None
+        hop = self.next_hops[source][target]
+        if hop is None:
+            hop = self._search_first_hop(source, target)
+            self.next_hops[source][target] = hop
+        return self.cells[hop] if hop >= 0 else None
+
+    def hop_table(self):
+        """Return every next hop as a (cells, cells) numpy array of cell indices
+
+        Ties are resolved as next_step resolves them and -1 means no move.
+        Requires path tables.
+        """
+        if self.next_hops is None:
+            raise ValueError(f"Maze has more than {self.PATH_TABLE_LIMIT} walkable cells "
+                             "and no path tables")
+        if not _load_numpy():
+            raise ImportError("Maze.hop_table requires numpy")
+        table = np.empty((len(self.cells), len(self.cells)), dtype=np.int32)
+        for source, hops in enumerate(self.next_hops):
+            for target, hop in enumerate(hops):
+                if hop is None:
+                    hops[target] = self._search_first_hop(source, target)
+            table[source] = hops
+        return table
+
+    def distance(self, start, goal):
+        """Return the path length between two cells, or -1 if unreachable"""
+        source = self.cell_index.get(start)
+        target = self.cell_index.get(goal)
+        if source is None or target is None:
+            return -1
+        return self.distances[source][target]
+
+    def _count_pellets(self):
+        """Count the dots and power pellets left in the layout"""
+        if self.use_numpy:
+            self.dots_remaining = int(np.count_nonzero(self.grid == 1))
+            self.power_pellets_remaining = int(np.count_nonzero(self.grid == 2))
+        else:
+            self.dots_remaining = sum(row.count(1) for row in self.layout)
+            self.power_pellets_remaining = sum(row.count(2) for row in self.layout)
+
+    @property
+    def pellets_remaining(self):
+        """Total dots and power pellets left to eat"""
+        return self.dots_remaining + self.power_pellets_remaining
+
+    def pellet_positions(self, kinds=(1, 2)):
+        """Return the (x, y) cells still holding one of the given pellet kinds"""
+        if self.use_numpy:
+            ys, xs = np.nonzero(np.isin(self.grid, kinds))
+            return list(zip(xs.tolist(), ys.tolist()))
+        return [(x, y) for y, row in enumerate(self.layout)
+                for x, cell in enumerate(row) if cell in kinds]
+
+    def clear_cell(self, x, y):
+        """Empty a cell, keeping the pellet counters in step, and return its old value"""
+        if self.use_numpy:
+            val = int(self.grid[y, x])
+            self.grid[y, x] = 3
+        else:
+            val = self.layout[y][x]
+            self.layout[y][x] = 3
+        if val == 1:
+            self.dots_remaining -= 1
+        elif val == 2:
+            self.power_pellets_remaining -= 1
+        if self._board is not None:
+            self._board.clear(x, y, val)
+        return val
+
+    def pellet_state(self):
+        """Return the current grid as row-major bytes"""
+        if self.use_numpy:
+            return self.grid.tobytes()
+        return b''.join(map(bytes, self.layout))
+
+    def pellet_board(self):
+        """Return the PelletBoard mirroring this maze's pellets, built on first use
+
+        Once built it follows every clear_cell, reset and restore_pellets.
+        """
+        if self._board is None:
+            self._board = PelletBoard(self)
+        return self._board
+
+    def pellet_bits(self):
+        """Return the pellet board's (dots, power) bitsets, or None without a board"""
+        if self._board is None:
+            return None
+        return self._board.dots, self._board.power
+
+    def restore_pellets(self, data, dots_remaining, power_pellets_remaining, bits=None):
+        """Load a grid saved by pellet_state, with its pellet counters
+
+        bits, from pellet_bits at the same time, spares the pellet board a
+        rescan of the grid.
+        """
+        if self.use_numpy:
+            self.grid[...] = np.frombuffer(data, dtype=np.uint8).reshape(self.grid.shape)
+        else:
+            width = self.width
+            self.layout = [list(data[i:i + width]) for i in range(0, len(data), width)]
+        self.dots_remaining = dots_remaining
+        self.power_pellets_remaining = power_pellets_remaining
+        if self._board is not None:
+            self._board.load(*(bits or self._board.read(self)))
+
+    def _find_cells(self, value):
+        """Find every cell holding a value, in row-major order"""
+        if self.use_numpy:
+            ys, xs = np.nonzero(self._initial == value)
+            return list(zip(xs.tolist(), ys.tolist()))
+        return [(x, y) for y, row in enumerate(self._initial)
+                for x, cell in enumerate(row) if cell == value]
 
     def _find_pacman_start(self):
         """Find Pac-Man's starting position"""
-        for y, row in enumerate(self.layout):
-            for x, cell in enumerate(row):
-                if cell == 4:
-                    return x, y
-        return 0, 0
+        starts = self._find_cells(4)
+        return starts[0] if starts else (0, 0)
 
     def _find_ghost_spawns(self):
         """Find ghost spawn positions"""
-        spawns = []
-        for y, row in enumerate(self.layout):
-            for x, cell in enumerate(row):
-                if cell == 5:
-                    spawns.append((x, y))
-        return spawns
+        return self._find_cells(5)
+
+    def walkable_neighbors(self, x, y):
+        """Return the walkable cells next to (x, y)"""
+        return [(x + dx, y + dy) for dx, dy in self.NEIGHBOR_OFFSETS
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height
+                and not self.check_collision(x + dx, y + dy)]
+
+    def neighbor_masks(self):
+        """Return a (4, height, width) mask of walkable neighbours per direction
+
+        Directions follow NEIGHBOR_OFFSETS; cells off the grid count as walls.
+        """
+        if not _load_numpy():
+            raise ImportError("Maze.neighbor_masks requires numpy")
+        walkable = self.walkable if self.use_numpy else np.array(self._initial) != 0
+        padded = np.pad(walkable, 1, constant_values=False)
+        return np.stack([padded[1 + dy:1 + dy + self.height, 1 + dx:1 + dx + self.width]
+                         for dx, dy in self.NEIGHBOR_OFFSETS])
 
     def check_collision(self, x, y):
         """Check if position is a wall"""
+        if self.use_numpy:
+            return not self.walkable[y, x]
         return self.layout[y][x] == 0
 
-    def load_maze(self, drawer):
-        """Load and draw maze on screen"""
-        drawer.clear()
+    def _wall_runs(self, y):
+        """Return the [start, end) column spans of wall cells in a row"""
+        if self.use_numpy:
+            walls = np.concatenate(([False], ~self.walkable[y], [False]))
+            edges = np.flatnonzero(walls[1:] != walls[:-1]).tolist()
+            return list(zip(edges[::2], edges[1::2]))
+        runs = []
+        start = None
+        for x, cell in enumerate(self._initial[y]):
+            if cell == 0 and start is None:
+                start = x
+            elif cell != 0 and start is not None:
+                runs.append((start, x))
+                start = None
+        if start is not None:
+            runs.append((start, self.width))
+        return runs
+
+    def wall_rectangles(self):
+        """Merge wall cells into (x, y, width, height) rectangles, in cells
+
+        Runs of walls in a row are joined first, then identical runs in
+        consecutive rows are stacked into one rectangle.
+        """
+        rects = []
+        open_rects = {}
+        for y in range(self.height):
+            next_open = {}
+            for run in self._wall_runs(y):
+                rect = open_rects.pop(run, None)
+                if rect is None:
+                    rect = [run[0], y, run[1] - run[0], 0]
+                rect[3] += 1
+                next_open[run] = rect
+            rects.extend(open_rects.values())
+            open_rects = next_open
+        rects.extend(open_rects.values())
+        return [tuple(rect) for rect in rects]
+
+    def draw_walls(self, drawer):
+        """Draw the walls as merged filled rectangles"""
         drawer.penup()
         drawer.speed(0)
         drawer.hideturtle()
+        drawer.setheading(0)
+        drawer.color('blue')
+        for x, y, w, h in self.wall_rectangles():
+            drawer.goto(self.MAZE_OFFSET_X + x * self.TILE_SIZE,
+                        self.MAZE_OFFSET_Y - y * self.TILE_SIZE)
+            drawer.begin_fill()
+            for length in (w, h, w, h):
+                drawer.forward(length * self.TILE_SIZE)
+                drawer.right(90)
+            drawer.end_fill()
 
-        for y, row in enumerate(self.layout):
-            for x, cell in enumerate(row):
-                screen_x = self.MAZE_OFFSET_X + (x * self.TILE_SIZE)
-                screen_y = self.MAZE_OFFSET_Y - (y * self.TILE_SIZE)
-
-                if cell == 0:
-                    drawer.goto(screen_x, screen_y)
-                    drawer.color('blue')
-                    drawer.begin_fill()
-                    for _ in range(4):
-                        drawer.forward(self.TILE_SIZE)
-                        drawer.right(90)
-                    drawer.end_fill()
-                elif cell == 1:
-                    drawer.goto(screen_x + self.TILE_SIZE/2, screen_y - self.TILE_SIZE/2)
-                    drawer.color('white')
-                    drawer.dot(8)
-                elif cell == 2:
-                    drawer.goto(screen_x + self.TILE_SIZE/2, screen_y - self.TILE_SIZE/2)
-                    drawer.color('white')
-                    drawer.dot(14)
+    def draw_pellets(self, drawer):
+        """Draw the dots and power pellets still in the maze"""
+        drawer.penup()
+        drawer.speed(0)
+        drawer.hideturtle()
+        drawer.color('white')
+        for kind, size in ((1, 8), (2, 14)):
+            for x, y in self.pellet_positions((kind,)):
+                drawer.goto(self.MAZE_OFFSET_X + x * self.TILE_SIZE + self.TILE_SIZE / 2,
+                            self.MAZE_OFFSET_Y - y * self.TILE_SIZE - self.TILE_SIZE / 2)
+                drawer.dot(size)
+
+    def load_maze(self, drawer):
+        """Load and draw maze on screen"""
+        drawer.clear()
+        self.draw_walls(drawer)
+        self.draw_pellets(drawer)
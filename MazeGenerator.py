@@ -0,0 +1,133 @@
+"""Maze generator class"""
+import random
+
+
+class MazeGenerator:
+    """Builds seeded random maze layouts in the LAYOUTS cell encoding
+
+    Corridors are carved by a depth-first search over the odd cells, then
+    walls between neighbouring corridors are knocked out with loop_chance,
+    so the maze has loops instead of being a tree of dead ends. Every
+    corridor holds a dot (1). Pac-Man (4) starts at the bottom centre,
+    ghosts (5) spawn around the middle and power pellets (2) go to the
+    corners first. The same size and seed always give the same layout.
+    """
+    MIN_SIZE = 5
+    MAX_SIZE = 1000
+    LOOP_CHANCE = 0.1
+
+    def __init__(self, width, height, seed=0, ghost_spawns=4, power_pellets=4,
+                 loop_chance=LOOP_CHANCE):
+        for name, size in (('width', width), ('height', height)):
+            if not self.MIN_SIZE <= size <= self.MAX_SIZE:
+                raise ValueError(f"Maze {name} must be between {self.MIN_SIZE} and "
+                                 f"{self.MAX_SIZE}, got {size}")
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.ghost_spawns = ghost_spawns
+        self.power_pellets = power_pellets
+        self.loop_chance = loop_chance
+
+    @classmethod
+    def parse_size(cls, text):
+        """Parse a WIDTHxHEIGHT maze size"""
+        width, sep, height = text.lower().partition('x')
+        if not sep or not width.isdigit() or not height.isdigit():
+            raise ValueError(f"Expected a size like 101x101, got {text!r}")
+        return int(width), int(height)
+
+    def _carve(self, rng, cols, rows):
+        """Carve a spanning tree over the cols x rows odd cells; return open flags
+
+        The result is row-major over the full grid.
+        """
+        width = self.width
+        is_open = bytearray(width * self.height)
+        visited = bytearray(cols * rows)
+        start = rng.randrange(cols * rows)
+        visited[start] = 1
+        is_open[(2 * (start // cols) + 1) * width + 2 * (start % cols) + 1] = 1
+        stack = [start]
+        while stack:
+            cell = stack[-1]
+            cx, cy = cell % cols, cell // cols
+            options = []
+            if cx > 0 and not visited[cell - 1]:
+                options.append(cell - 1)
+            if cx < cols - 1 and not visited[cell + 1]:
+                options.append(cell + 1)
+            if cy > 0 and not visited[cell - cols]:
+                options.append(cell - cols)
+            if cy < rows - 1 and not visited[cell + cols]:
+                options.append(cell + cols)
+            if not options:
+                stack.pop()
+                continue
+            nxt = options[rng.randrange(len(options))] if len(options) > 1 else options[0]
+            visited[nxt] = 1
+            nx, ny = 2 * (nxt % cols) + 1, 2 * (nxt // cols) + 1
+            is_open[ny * width + nx] = 1
+            is_open[(ny + cy * 2 + 1) // 2 * width + (nx + cx * 2 + 1) // 2] = 1
+            stack.append(nxt)
+        return is_open
+
+    def _add_loops(self, rng, is_open, cols, rows):
+        """Open some of the walls still standing between two odd cells"""
+        width, chance = self.width, self.loop_chance
+        if chance <= 0:
+            return
+        for cy in range(rows):
+            y = 2 * cy + 1
+            for cx in range(cols):
+                x = 2 * cx + 1
+                if cx < cols - 1 and not is_open[y * width + x + 1] and rng.random() < chance:
+                    is_open[y * width + x + 1] = 1
+                if cy < rows - 1 and not is_open[(y + 1) * width + x] and rng.random() < chance:
+                    is_open[(y + 1) * width + x] = 1
+
+    @staticmethod
+    def _nearest(x, y, count, taken, last_x, last_y):
+        """The count odd cells nearest (Manhattan) to (x, y) that are not taken yet"""
+        reach = 2
+        while True:
+            window = [(abs(cx - x) + abs(cy - y), cy, cx)
+                      for cy in range(max(1, y - reach) | 1, min(last_y, y + reach) + 1, 2)
+                      for cx in range(max(1, x - reach) | 1, min(last_x, x + reach) + 1, 2)
+                      if abs(cx - x) + abs(cy - y) <= reach and (cx, cy) not in taken]
+            if len(window) >= count or reach > last_x + last_y:
+                break
+            reach *= 2
+        found = [(cx, cy) for _, cy, cx in sorted(window)[:count]]
+        taken.update(found)
+        return found
+
+    def generate(self):
+        """Return a new layout as a list of rows"""
+        rng = random.Random(self.seed)
+        width, height = self.width, self.height
+        cols, rows = (width - 1) // 2, (height - 1) // 2
+        is_open = self._carve(rng, cols, rows)
+        self._add_loops(rng, is_open, cols, rows)
+        layout = [[is_open[y * width + x] for x in range(width)] for y in range(height)]
+        last_x, last_y = 2 * cols - 1, 2 * rows - 1
+        taken = set()
+        start, = self._nearest(width // 2, last_y, 1, taken, last_x, last_y)
+        spawns = self._nearest(width // 2, height // 2, self.ghost_spawns, taken,
+                               last_x, last_y)
+        corners = [(1, 1), (last_x, 1), (1, last_y), (last_x, last_y)]
+        pellets = [cell for cell in dict.fromkeys(corners) if cell not in taken]
+        pellets = pellets[:self.power_pellets]
+        taken.update(pellets)
+        if len(pellets) < self.power_pellets:
+            free = [(x, y) for y in range(1, last_y + 1, 2) for x in range(1, last_x + 1, 2)
+                    if (x, y) not in taken]
+            extra = rng.sample(free, min(len(free), self.power_pellets - len(pellets)))
+            pellets.extend(extra)
+            taken.update(extra)
+        for x, y in pellets:
+            layout[y][x] = 2
+        layout[start[1]][start[0]] = 4
+        for x, y in spawns:
+            layout[y][x] = 5
+        return layout
@@ -0,0 +1,67 @@
+"""Maze renderer class"""
+import turtle
+
+
+class MazeRenderer:
+    """Draws mazes with a cached wall layer per key and a redrawn pellet layer"""
+
+    def __init__(self):
+        self.wall_layers = {}
+        self.pellet_drawer = None
+        self.current_key = None
+
+    @staticmethod
+    def _new_drawer():
+        """Create a hidden drawing turtle"""
+        drawer = turtle.Turtle()
+        drawer.shape('square')
+        drawer.hideturtle()
+        drawer.penup()
+        drawer.speed(0)
+        return drawer
+
+    def _alive(self):
+        """Check the cached turtles still belong to the current screen"""
+        screen_turtles = turtle.turtles()
+        return self.pellet_drawer in screen_turtles and \
+            all(layer in screen_turtles for layer in self.wall_layers.values())
+
+    def _set_layer_state(self, layer, state):
+        """Show or hide every canvas item a wall layer has drawn"""
+        canvas = layer.screen.cv
+        for item in layer.items:
+            canvas.itemconfigure(item, state=state)
+
+    def owns(self, drawer):
+        """Check if a turtle is one of the renderer's wall layers"""
+        return any(drawer is layer for layer in self.wall_layers.values())
+
+    def invalidate(self):
+        """Forget every cached layer, e.g. after the screen has been cleared"""
+        self.wall_layers = {}
+        self.pellet_drawer = None
+        self.current_key = None
+
+    def draw(self, maze, key):
+        """Draw a maze, reusing the wall layer cached under key
+
+        Returns the pellet drawer, which Pac-Man uses to erase eaten pellets.
+        """
+        if not self._alive():
+            self.invalidate()
+        if self.current_key is not None and self.current_key != key:
+            self._set_layer_state(self.wall_layers[self.current_key], 'hidden')
+        layer = self.wall_layers.get(key)
+        if layer is None:
+            layer = self._new_drawer()
+            maze.draw_walls(layer)
+            self.wall_layers[key] = layer
+        elif key != self.current_key:
+            self._set_layer_state(layer, 'normal')
+        self.current_key = key
+
+        if self.pellet_drawer is None:
+            self.pellet_drawer = self._new_drawer()
+        self.pellet_drawer.clear()
+        maze.draw_pellets(self.pellet_drawer)
+        return self.pellet_drawer
@@ -1,5 +1,4 @@
 """PacMan class"""
-import turtle
 
 
 class PacMan:
@@ -16,8 +15,11 @@ class PacMan:
     NORMAL_STATE = 'normal'
     POWERED_STATE = 'powered'
 
-    def __init__(self, maze, settings):
-        """Initialize Pac-Man"""
+    def __init__(self, maze, settings, render=True, sprites=None):
+        """Initialize Pac-Man, without a turtle icon when render is False
+
+        The icon comes from the sprites pool when one is given.
+        """
         self.maze = maze
         self.settings = settings
         self.x, self.y = maze.pacman_start
@@ -28,11 +30,16 @@ class PacMan:
         self.dots_collected = 0
         self.ghosts_eaten = 0
         self.power_pallets_collected = 0
-        self._setup_icon()
+        self.icon = None
+        self.rendered_pos = None
+        self.dirty = False
+        if render:
+            self._setup_icon(sprites)
 
-    def _setup_icon(self):
+    def _setup_icon(self, sprites=None):
         """Setup Pac-Man's turtle icon"""
-        self.icon = turtle.Turtle()
+        import turtle
+        self.icon = sprites.acquire('pacman', turtle.Turtle) if sprites else turtle.Turtle()
         self.icon.shape('circle')
         self.icon.color('yellow')
         self.icon.penup()
@@ -66,11 +73,11 @@ class PacMan:
             if val == 1:
                 self.score += self.DOT_SCORE
                 self.dots_collected += 1
-                self.maze.layout[ny][nx] = 3
+                self.maze.clear_cell(nx, ny)
             elif val == 2:
                 self.score += self.POWER_SCORE
                 self.power_pallets_collected += 1
-                self.maze.layout[ny][nx] = 3
+                self.maze.clear_cell(nx, ny)
                 self.power_up()
             if drawer:
                 sx, sy = self._calculate_screen_position(nx, ny)
@@ -80,10 +87,17 @@ class PacMan:
             self.update_position()
 
     def update_position(self):
-        """Update Pac-Man's position on screen"""
-        sx, sy = self._calculate_screen_position(self.x, self.y)
-        self.icon.goto(sx, sy)
-        self.icon.showturtle()
+        """Update Pac-Man's position on screen, touching the icon only on change"""
+        if self.icon is None:
+            return
+        pos = self._calculate_screen_position(self.x, self.y)
+        if pos != self.rendered_pos:
+            self.icon.goto(pos)
+            self.rendered_pos = pos
+            self.dirty = True
+        if not self.icon.isvisible():
+            self.icon.showturtle()
+            self.dirty = True
 
     def eat_ghost(self):
         """Eat a ghost when powered up"""
@@ -0,0 +1,134 @@
+"""Pellet board class"""
+import random
+
+
+class PelletBoard:
+    """Dots and power pellets as integer bitsets over a maze's walkable cells
+
+    Bit i of dots (or power) is set while the i-th walkable cell, in
+    row-major order, still holds a dot (or power pellet), so the pellets
+    left are a popcount. Every (cell, kind) pair has a fixed random 64-bit
+    Zobrist key and pellet_hash is the XOR of the keys of the pellets left,
+    updated as pellets are eaten or the bitsets change. state_hash adds
+    Pac-Man's cell, each ghost's cell and the power timer with a few more
+    XORs. Keys come from a fixed seed, so hashes agree across runs and
+    processes.
+    """
+    ZOBRIST_SEED = 0x5EED
+    DOT_KEYS = 0
+    POWER_KEYS = 1
+    PACMAN_KEYS = 2
+    POWER_TIMER_KEYS = 3
+    GHOST_KEYS = 4
+    _key_tables = {}
+
+    def __init__(self, maze):
+        """Index a maze's walkable cells and load its current pellets"""
+        if maze.cells:
+            self.cells, self.cell_index = maze.cells, maze.cell_index
+        else:
+            width = maze.width
+            self.cells = [(i % width, i // width)
+                          for i, cell_open in enumerate(maze._open_cells()) if cell_open]
+            self.cell_index = {pos: i for i, pos in enumerate(self.cells)}
+        count = len(self.cells)
+        self.dot_keys = self.keys(self.DOT_KEYS, count)
+        self.power_keys = self.keys(self.POWER_KEYS, count)
+        self.pacman_keys = self.keys(self.PACMAN_KEYS, count)
+        self.ghost_keys = []
+        self.dots = 0
+        self.power = 0
+        self.pellet_hash = 0
+        self.load(*self.read(maze))
+        self._initial = (self.dots, self.power, self.pellet_hash)
+
+    @classmethod
+    def keys(cls, table, count):
+        """The first count Zobrist keys of a table; the list grows in place as needed"""
+        entry = cls._key_tables.get(table)
+        if entry is None:
+            entry = cls._key_tables[table] = (random.Random(cls.ZOBRIST_SEED + table), [])
+        rng, keys = entry
+        if len(keys) < count:
+            keys.extend(rng.getrandbits(64) for _ in range(count - len(keys)))
+        return keys
+
+    def read(self, maze):
+        """Return (dots, power) bitsets of a maze's current grid"""
+        if maze.use_numpy:
+            import numpy as np
+            values = maze.grid.ravel()[np.flatnonzero(maze.walkable)]
+            return tuple(int.from_bytes(np.packbits(values == kind, bitorder='little').tobytes(),
+                                        'little') for kind in (1, 2))
+        dots = power = 0
+        layout = maze.layout
+        for i, (x, y) in enumerate(self.cells):
+            val = layout[y][x]
+            if val == 1:
+                dots |= 1 << i
+            elif val == 2:
+                power |= 1 << i
+        return dots, power
+
+    @staticmethod
+    def _fold(bits, keys, value):
+        """XOR into value the keys of every set bit"""
+        digits = bin(bits)[:1:-1]
+        i = digits.find('1')
+        while i >= 0:
+            value ^= keys[i]
+            i = digits.find('1', i + 1)
+        return value
+
+    def load(self, dots, power):
+        """Replace the bitsets, rehashing only the bits that changed"""
+        value = self._fold(self.dots ^ dots, self.dot_keys, self.pellet_hash)
+        self.pellet_hash = self._fold(self.power ^ power, self.power_keys, value)
+        self.dots = dots
+        self.power = power
+
+    def reset(self):
+        """Put every pellet back"""
+        self.dots, self.power, self.pellet_hash = self._initial
+
+    def clear(self, x, y, val):
+        """Drop the pellet a cell held before it was emptied (val is its old value)"""
+        if val == 1:
+            i = self.cell_index[(x, y)]
+            self.dots &= ~(1 << i)
+            self.pellet_hash ^= self.dot_keys[i]
+        elif val == 2:
+            i = self.cell_index[(x, y)]
+            self.power &= ~(1 << i)
+            self.pellet_hash ^= self.power_keys[i]
+
+    @property
+    def dots_remaining(self):
+        """Dots left, by popcount"""
+        return self.dots.bit_count()
+
+    @property
+    def power_pellets_remaining(self):
+        """Power pellets left, by popcount"""
+        return self.power.bit_count()
+
+    def has_pellet(self, x, y):
+        """Whether a cell still holds a dot or power pellet"""
+        i = self.cell_index.get((x, y))
+        return i is not None and bool((self.dots | self.power) >> i & 1)
+
+    def state_hash(self, pacman, ghosts, power_timer=0):
+        """Zobrist hash of the pellets, Pac-Man's and each ghost's (x, y) and the power timer
+
+        Ghosts are told apart by their order, and power_timer is 0 while
+        Pac-Man is not powered.
+        """
+        index = self.cell_index
+        value = self.pellet_hash ^ self.pacman_keys[index[pacman]]
+        value ^= self.keys(self.POWER_TIMER_KEYS, power_timer + 1)[power_timer]
+        ghost_keys = self.ghost_keys
+        for slot, ghost in enumerate(ghosts):
+            if slot == len(ghost_keys):
+                ghost_keys.append(self.keys(self.GHOST_KEYS + slot, len(self.cells)))
+            value ^= ghost_keys[slot][index[ghost]]
+        return value
@@ -0,0 +1,203 @@
+"""Replay log class"""
+import hashlib
+import struct
+from datetime import datetime, timedelta
+from GameEngine import GameEngine
+from StatsStore import StatsStore
+
+
+class ReplayLog:
+    """Compact binary record of one game's inputs that replays without a display
+
+    Inputs are tagged with GameEngine.tick_count, so replaying them between
+    the same ticks reproduces the game exactly. The wall-clock times of the
+    statistics snapshots are logged too, so a replay rebuilds the same
+    timestamps history.
+
+    File layout, little endian:
+      header  b'PCRL', version u8, difficulty (u8 length, ascii), layout hash
+              (8 bytes), ghost_count u8, ghost_speed u16, power_duration u16,
+              respawn_delay u16
+      events  tick delta as a varint, then a code byte: 0-3 an arrow key in
+              GameEngine.ACTIONS order, 4 a snapshot followed by its time as
+              i64 microseconds since 1970
+      footer  code 255, tick_count u32, timer u32, score u32, lives i8, dots
+              u16, ghosts u16, power pellets u16, won u8, then an 8-byte digest
+              of the snapshots
+    """
+    MAGIC = b'PCRL'
+    VERSION = 1
+    ACTIONS = list(GameEngine.ACTIONS)
+    SNAPSHOT = 4
+    END = 255
+    EPOCH = datetime(1970, 1, 1)
+    HEADER = struct.Struct('<8sBHHH')
+    FOOTER = struct.Struct('<IIIbHHHB8s')
+    RESULT_KEYS = ['tick_count', 'timer', 'score', 'lives', 'dots_collected',
+                   'ghosts_eaten', 'power_pallets_collected', 'won', 'snapshots']
+
+    def __init__(self, difficulty, layout_hash, settings, respawn_delay):
+        self.difficulty = difficulty
+        self.layout_hash = layout_hash
+        self.settings = dict(settings)
+        self.respawn_delay = respawn_delay
+        self.events = []
+        self.result = None
+
+    @classmethod
+    def for_engine(cls, engine):
+        """Start a log for a freshly reset engine"""
+        return cls(engine.difficulty, engine.maze.layout_hash(), engine.settings,
+                   engine.respawn_delay)
+
+    def record_input(self, tick, action):
+        """Log an arrow key pressed after the given tick"""
+        self.events.append((tick, self.ACTIONS.index(action), None))
+
+    def record_snapshot(self, tick, when):
+        """Log the time of a statistics snapshot taken after the given tick"""
+        self.events.append((tick, self.SNAPSHOT, when))
+
+    @staticmethod
+    def digest(timestamps):
+        """Short digest of a list of StatisticsManager timestamp entries"""
+        return hashlib.blake2b(repr(timestamps).encode(), digest_size=8).digest()
+
+    @staticmethod
+    def outcome(engine, timestamps):
+        """The values a replay must reproduce"""
+        pacman = engine.pacman
+        return {
+            'tick_count': engine.tick_count,
+            'timer': engine.timer,
+            'score': pacman.score,
+            'lives': pacman.lives,
+            'dots_collected': pacman.dots_collected,
+            'ghosts_eaten': pacman.ghosts_eaten,
+            'power_pallets_collected': pacman.power_pallets_collected,
+            'won': engine.won,
+            'snapshots': ReplayLog.digest(timestamps)
+        }
+
+    def finish(self, engine, timestamps):
+        """Record how the game ended; timestamps are this game's snapshot entries"""
+        self.result = self.outcome(engine, timestamps)
+
+    def to_bytes(self):
+        """Encode the log"""
+        out = bytearray(self.MAGIC)
+        out.append(self.VERSION)
+        name = self.difficulty.encode('ascii')
+        out.append(len(name))
+        out += name
+        out += self.HEADER.pack(self.layout_hash, self.settings['ghost_count'],
+                                self.settings['ghost_speed'],
+                                self.settings['power_duration'], self.respawn_delay)
+        last = 0
+        for tick, code, when in self.events:
+            delta = tick - last
+            last = tick
+            while delta >= 0x80:
+                out.append(delta & 0x7F | 0x80)
+                delta >>= 7
+            out.append(delta)
+            out.append(code)
+            if code == self.SNAPSHOT:
+                out += struct.pack('<q', (when - self.EPOCH) // timedelta(microseconds=1))
+        if self.result is not None:
+            out.append(0)
+            out.append(self.END)
+            out += self.FOOTER.pack(*(self.result[key] for key in self.RESULT_KEYS))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode a log written by to_bytes"""
+        if data[:4] != cls.MAGIC or data[4] != cls.VERSION:
+            raise ValueError("Not a Pixel Chomp replay log")
+        pos = 6 + data[5]
+        difficulty = data[6:pos].decode('ascii')
+        layout_hash, ghost_count, ghost_speed, power_duration, respawn_delay = \
+            cls.HEADER.unpack_from(data, pos)
+        pos += cls.HEADER.size
+        log = cls(difficulty, layout_hash, {'ghost_count': ghost_count,
+                                            'ghost_speed': ghost_speed,
+                                            'power_duration': power_duration},
+                  respawn_delay)
+        tick = 0
+        while pos < len(data):
+            delta = shift = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                delta |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += delta
+            code = data[pos]
+            pos += 1
+            if code == cls.END:
+                values = cls.FOOTER.unpack_from(data, pos)
+                log.result = dict(zip(cls.RESULT_KEYS, values))
+                log.result['won'] = bool(log.result['won'])
+                break
+            when = None
+            if code == cls.SNAPSHOT:
+                when = cls.EPOCH + timedelta(microseconds=struct.unpack_from('<q', data, pos)[0])
+                pos += 8
+            log.events.append((tick, code, when))
+        return log
+
+    def save(self, path):
+        """Write the log to a file"""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Read a log from a file"""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def replay(self, render=False, on_start=None, on_tick=None):
+        """Re-run the game as fast as possible and return (outcome, timestamps)
+
+        Runs to the logged end of the game. With render the engine creates
+        its turtle sprites; on_start(engine) may draw the maze and return the
+        pellet drawer, and on_tick(engine) is called after every tick.
+        """
+        engine = GameEngine(self.difficulty, render=render, respawn_delay=self.respawn_delay,
+                            settings=self.settings)
+        if engine.maze.layout_hash() != self.layout_hash:
+            raise ValueError(f"The {self.difficulty} layout changed since this game was recorded")
+        timestamps = []
+        drawer = on_start(engine) if on_start else None
+        end = self.result['tick_count'] if self.result else None
+        events = self.events
+        i = 0
+
+        def apply(tick, i):
+            while i < len(events) and events[i][0] == tick:
+                _, code, when = events[i]
+                if code == self.SNAPSHOT:
+                    timestamps.append(StatsStore.timestamp_entry(when.isoformat(),
+                                                                 engine.pacman))
+                else:
+                    engine.move_pacman(self.ACTIONS[code], drawer)
+                i += 1
+            return i
+
+        i = apply(0, i)
+        while engine.game_state == 'running' and (end is None or engine.tick_count < end):
+            engine.tick()
+            i = apply(engine.tick_count, i)
+            if on_tick:
+                on_tick(engine)
+        return self.outcome(engine, timestamps), timestamps
+
+    def verify(self, outcome):
+        """Return the keys whose replayed value differs from the logged one"""
+        if self.result is None:
+            return []
+        return [key for key in self.RESULT_KEYS if outcome[key] != self.result[key]]
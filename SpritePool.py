@@ -0,0 +1,52 @@
+"""Sprite pool class"""
+import turtle
+
+
+class SpritePool:
+    """Keeps sprite turtles for reuse instead of creating new ones every game
+
+    A turtle can't be removed from its screen once created, so every game
+    that makes fresh sprites adds canvas items for good. Sprites are handed
+    out by kind and come back hidden with release, ready for the next game.
+    Pooled turtles that no longer belong to the screen, e.g. after
+    clearscreen, are dropped on acquire.
+    """
+
+    def __init__(self):
+        self.free = {}
+        self.in_use = {}
+        self.created = 0
+
+    def acquire(self, kind, factory):
+        """Return an idle turtle of a kind, or a new one made by factory()"""
+        stack = self.free.get(kind)
+        sprite = None
+        if stack:
+            live = turtle.turtles()
+            while stack and sprite is None:
+                candidate = stack.pop()
+                if candidate in live:
+                    sprite = candidate
+        if sprite is None:
+            sprite = factory()
+            self.created += 1
+        self.in_use[id(sprite)] = (kind, sprite)
+        return sprite
+
+    def release(self, sprite):
+        """Hide a sprite, wipe its drawings and return it to the pool"""
+        entry = self.in_use.pop(id(sprite), None)
+        if entry is None:
+            return
+        kind, sprite = entry
+        try:
+            sprite.hideturtle()
+            sprite.clear()
+        except turtle.TurtleGraphicsError:
+            return
+        self.free.setdefault(kind, []).append(sprite)
+
+    def invalidate(self):
+        """Forget every pooled turtle, e.g. after the screen has been cleared"""
+        self.free = {}
+        self.in_use = {}
@@ -1,18 +1,32 @@
 """Statistic Manager class"""
-import csv
+import atexit
 import os
+import threading
+from functools import partial
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import pandas as pd
+from StatsWriter import StatsWriter
+from StatsStore import StatsStore
+from ChartCache import ChartCache
 
 
 class StatisticsManager:
     """Handles recording and reporting game statistics"""
-
-    def __init__(self):
+    CHARTS = [
+        'Dots Collected by Difficulty',
+        'Ghosts Eaten Over Sessions',
+        'High Scores Per Session',
+        'Player vs Ghost Ratio',
+        'Stats by Difficulty'
+    ]
+    PLOT_COLUMNS = ['difficulty', 'duration', 'score', 'lives_lost',
+                    'dots_collected', 'ghosts_eaten']
+    DIFFICULTIES = ['easy', 'normal', 'hard']
+    MEMORY_LIMIT = 64 * 1024 * 1024
+
+    def __init__(self, db_path='game_stats.db', csv_path='game_stats.csv',
+                 memory_limit=MEMORY_LIMIT):
         self.player_data = {
             'timestamp': [], 'score': [], 'duration': [],
             'lives_lost': [], 'dots_collected': [],
@@ -22,18 +36,89 @@ class StatisticsManager:
         self.timestamps = []
         self.fig = None
         self.canvas = None
+        self.charts = {}
+        self.drawn = {}
+        self._chart_cache = None
         self.combo = None
         self.win = None
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.memory_limit = memory_limit
+        self._store = None
+        self._store_lock = threading.Lock()
+        self.store_error = None
+        self._aggregates = None
+        self.writers = {}
+        atexit.register(self.close)
+
+    @property
+    def store(self):
+        """Statistics store, opened (and the CSV history imported) on first use
+
+        The first save opens it on the writer thread, so the game never
+        waits on the schema setup or the import. If opening fails, e.g. on a
+        malformed CSV history, the error is kept in store_error and raised
+        again on every later use instead of retrying.
+        """
+        with self._store_lock:
+            if self._store is None:
+                if self.store_error is not None:
+                    raise self.store_error
+                try:
+                    self._store = StatsStore(self.db_path, self.csv_path)
+                except Exception as e:
+                    self.store_error = e
+                    raise
+        return self._store
+
+    def _append_rows(self, rows):
+        """Writer sink for the store, resolved on the writer thread
+
+        A store that cannot be opened fails the batch; the writer reports it
+        and counts the rows as failed.
+        """
+        self.store.append_rows(rows)
+
+    @property
+    def chart_cache(self):
+        """Chart series cache, keyed on the statistics store version"""
+        if self._chart_cache is None:
+            self._chart_cache = ChartCache(
+                self.aggregate_history,
+                self.compute_series, self.store.version)
+        return self._chart_cache
+
+    @property
+    def aggregates(self):
+        """Running per-difficulty aggregates, loaded once and kept current in memory"""
+        if self._aggregates is None:
+            writer = self.writers.get(None)
+            if writer is not None:
+                writer.flush()
+            self._aggregates = self.store.aggregates()
+        return self._aggregates
+
+    def aggregate_history(self, csv_path=None):
+        """Fold the statistics history into a StatsAggregator one chunk at a time
+
+        Reads the store, or a statistics CSV file when csv_path is given.
+        Chunks are sized to stay under memory_limit; the aggregator only
+        keeps one row per (difficulty, duration, dots) group.
+        """
+        from StatsAggregator import StatsAggregator
+        aggregator = StatsAggregator()
+        chunksize = self.store.chunk_rows(self.memory_limit)
+        if csv_path is None:
+            frames = self.store.iter_frames(self.PLOT_COLUMNS, chunksize=chunksize)
+        else:
+            frames = StatsStore.iter_csv_frames(csv_path, self.PLOT_COLUMNS, chunksize)
+        for frame in frames:
+            aggregator.add_frame(frame)
+        return aggregator
 
     def record_timestamp(self, timestamp, pacman):
         """Record timestamp of the game"""
-        self.timestamps.append({
-            'time': timestamp,
-            'score': pacman.score,
-            'dots': pacman.dots_collected,
-            'ghosts': pacman.ghosts_eaten,
-            'lives': pacman.lives
-        })
+        self.timestamps.append(StatsStore.timestamp_entry(timestamp, pacman))
 
     def record_data(self, pacman, duration, difficulty):
         """Record data of the game"""
@@ -47,36 +132,71 @@ class StatisticsManager:
             pacman.power_pallets_collected)
         self.player_data['difficulty'].append(difficulty)
 
-    def save_to_file(self, filename='game_stats.csv'):
-        """Save data to file"""
-        file_exists = os.path.isfile(filename)
-        with open(filename, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=self.player_data.keys())
-            if not file_exists:
-                writer.writeheader()
-            i = len(self.player_data['timestamp']) - 1
-            if i >= 0:
-                row = {k: self.player_data[k][i] for k in self.player_data}
-                writer.writerow(row)
+    def save_to_file(self, filename=None, final=False):
+        """Queue the latest row for the background writer
+
+        Rows go to the statistics store, or are appended to a CSV file when
+        a filename is given. Only a final row, the one saved as a game ends,
+        is ranked on the store's leaderboard.
+        """
+        i = len(self.player_data['timestamp']) - 1
+        if i < 0:
+            return
+        writer = self.writers.get(filename)
+        if writer is None:
+            if filename is None:
+                sink = self._append_rows
+            else:
+                sink = partial(StatsStore.append_csv, filename, list(self.player_data))
+            writer = StatsWriter(sink)
+            self.writers[filename] = writer
+        row = {k: self.player_data[k][i] for k in self.player_data}
+        if filename is None:
+            row['final'] = final
+            if self._aggregates is not None:
+                self.store.fold(self._aggregates, [row])
+        writer.write(row)
+
+    def flush(self):
+        """Wait until every queued row is written"""
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        """Flush and stop every background writer"""
+        for writer in self.writers.values():
+            writer.close()
+
+    def writer_counters(self):
+        """Return the write and flush latency counters of each writer"""
+        return {filename or self.db_path: writer.counters()
+                for filename, writer in self.writers.items()}
+
+    def export_csv(self, filename):
+        """Export the whole statistics history to a CSV file"""
+        self.flush()
+        self.store.export_csv(filename)
 
     def generate_report(self):
         """Generate summary report for the most recent game session"""
         if not self.player_data['score']:
             return ""
+        self.flush()
         report = "\nGame Performance Report\n" + "=" * 24 + "\n"
         current_difficulty = self.player_data['difficulty'][0] \
         if self.player_data['difficulty'] else None
 
         high_score = 0
         try:
-            df = pd.read_csv('game_stats.csv')
             if current_difficulty:
-                df_diff = df[df['difficulty'] == current_difficulty]
-                if not df_diff.empty:
-                    high_score = int(df_diff['score'].max())
+                high_score = self.aggregates.get(current_difficulty, {}).get('score_max') or 0
         except Exception:
             high_score = max(self.player_data['score'])
 
+        if self.store_error is not None:
+            report += (f"Statistics could not be saved: "
+                       f"{type(self.store_error).__name__}: {self.store_error}\n")
+
         total_score = self.player_data['score'][-1] if self.player_data['score'] else 0
         total_dots = self.player_data['dots_collected'][-1] if \
         self.player_data['dots_collected'] else 0
@@ -93,31 +213,24 @@ class StatisticsManager:
         report += f"Difficulty: {current_difficulty.capitalize() if current_difficulty else ''}\n"
         return report
 
-    def plot_text_stats(self, ax, df):
+    def plot_text_stats(self, ax, aggregates):
         """Plot text statistics in a table format"""
-        difficulties = ['Easy', 'Normal', 'Hard']
-        grouped = df.groupby('difficulty').agg({
-            'score': ['max', 'mean'],
-            'duration': 'mean'
-        })
-        grouped.columns = ['High Score', 'Average Score', 'Avg Survival Time (s)']
-        grouped = grouped.reset_index()
-        stats = {row['difficulty'].capitalize(): row for _, row in grouped.iterrows()}
+        difficulties = ['easy', 'normal', 'hard']
 
         table_data = []
         headers = ['Difficulty', 'High Score', 'Average Score', 'Avg Survival Time (s)']
-        
+
         for diff in difficulties:
-            row = stats.get(diff, None)
-            if row is not None:
+            entry = aggregates.get(diff)
+            if entry and entry['rows']:
                 table_data.append([
-                    diff,
-                    f"{int(row['High Score'])}",
-                    f"{row['Average Score']:.2f}",
-                    f"{row['Avg Survival Time (s)']:.1f}"
+                    diff.capitalize(),
+                    f"{int(entry['score_max'])}",
+                    f"{entry['score_sum'] / entry['rows']:.2f}",
+                    f"{entry['duration_sum'] / entry['rows']:.1f}"
                 ])
             else:
-                table_data.append([diff, "0", "0.00", "0.0"])
+                table_data.append([diff.capitalize(), "0", "0.00", "0.0"])
 
         table = ax.table(
             cellText=table_data,
@@ -142,27 +255,37 @@ class StatisticsManager:
         ax.axis('off')
         ax.set_title('Statistics by Difficulty', pad=20, fontsize=14, weight='bold')
 
-    def plot_dots_by_difficulty(self, ax, df):
+    def compute_series(self, choice, aggregator):
+        """Compute the series one chart draws, or None when there is nothing to plot"""
+        if choice == 'Stats by Difficulty':
+            aggregates = self.aggregates
+            return {diff: dict(entry) for diff, entry in aggregates.items()} or None
+        if aggregator.empty:
+            return None
+        if choice == 'Dots Collected by Difficulty':
+            return aggregator.dots_box_stats()
+        if choice == 'Ghosts Eaten Over Sessions':
+            return aggregator.mean_by_duration('ghosts_sum')
+        if choice == 'High Scores Per Session':
+            return aggregator.mean_by_duration('score_sum')
+        return {diff: (totals['ghosts_sum'], totals['lives_sum'])
+                for diff, totals in aggregator.totals().items()}
+
+    def plot_dots_by_difficulty(self, ax, series):
         """Plot dots collected by difficulty"""
-        data = [df[df['difficulty'] == diff]['dots_collected']
-                for diff in ['easy', 'normal', 'hard'] if
-                not df[df['difficulty'] == diff].empty]
-        labels = [diff.capitalize() for diff in ['easy', 'normal', 'hard'] if
-                  not df[df['difficulty'] == diff].empty]
-        ax.boxplot(data, tick_labels=labels)
+        ax.bxp([series[diff] for diff in self.DIFFICULTIES if diff in series])
         ax.set_title('Dots Collected by Difficulty')
         ax.set_ylabel('Dots')
         ax.set_xlabel('Difficulty')
 
-    def plot_ghosts_eaten(self, ax, df):
+    def plot_ghosts_eaten(self, ax, series):
         """Plot ghosts eaten over sessions"""
         colors = {'easy': 'royalblue', 'normal': 'orange', 'hard': 'crimson'}
         markers = {'easy': 'o', 'normal': 's', 'hard': '^'}
-        for diff in ['easy', 'normal', 'hard']:
-            sub = df[df['difficulty'] == diff]
-            if not sub.empty:
-                grouped = sub.groupby('duration')['ghosts_eaten'].mean().reset_index()
-                ax.plot(grouped['duration'], grouped['ghosts_eaten'],
+        for diff in self.DIFFICULTIES:
+            if diff in series:
+                durations, ghosts_eaten = series[diff]
+                ax.plot(durations, ghosts_eaten,
                         marker=markers[diff], markersize=8, linestyle='-', linewidth=2,
                         color=colors[diff], label=diff.capitalize())
         ax.set_title('Ghosts Eaten Over Sessions')
@@ -172,15 +295,14 @@ class StatisticsManager:
         ax.set_facecolor('#f7f7f7')
         ax.legend()
 
-    def plot_high_scores(self, ax, df):
+    def plot_high_scores(self, ax, series):
         """Plot high scores per session"""
         colors = {'easy': 'royalblue', 'normal': 'orange', 'hard': 'crimson'}
         markers = {'easy': 'o', 'normal': 's', 'hard': '^'}
-        for diff in ['easy', 'normal', 'hard']:
-            sub = df[df['difficulty'] == diff]
-            if not sub.empty:
-                grouped = sub.groupby('duration')['score'].mean().reset_index()
-                ax.plot(grouped['duration'], grouped['score'],
+        for diff in self.DIFFICULTIES:
+            if diff in series:
+                durations, scores = series[diff]
+                ax.plot(durations, scores,
                         marker=markers[diff], markersize=8, linestyle='-', linewidth=2,
                         color=colors[diff], label=diff.capitalize())
         ax.set_title('High Scores Per Session')
@@ -190,16 +312,14 @@ class StatisticsManager:
         ax.set_facecolor('#f7f7f7')
         ax.legend()
 
-    def plot_player_vs_ghost(self, fig, df):
+    def plot_player_vs_ghost(self, fig, series):
         """Plot player vs ghost ratio"""
         fig.clf()
         fig.set_size_inches(8, 5)
         fig.subplots_adjust(left=0.09, right=0.85, wspace=0.25, top=0.75, bottom=0.15)
-        for i, diff in enumerate(['easy', 'normal', 'hard']):
+        for i, diff in enumerate(self.DIFFICULTIES):
             ax = fig.add_subplot(1, 3, i + 1)
-            sub = df[df['difficulty'] == diff]
-            ghosts_eaten = sub['ghosts_eaten'].sum()
-            lives_lost = sub['lives_lost'].sum()
+            ghosts_eaten, lives_lost = series.get(diff, (0, 0))
             total = ghosts_eaten + lives_lost
             if total == 0:
                 ax.text(0.5, 0.5, f'No data for {diff.capitalize()}',
@@ -217,29 +337,59 @@ class StatisticsManager:
                 ax.set_title(f'{diff.capitalize()}', fontsize=13)
         fig.suptitle('Player vs. Ghost Ratio by Difficulty', fontsize=16, y=0.90)
 
-    def update_plot(self, choice):
-        """Update plot based on selection"""
-        self.fig.clf()
-        ax = self.fig.add_subplot(111)
-        try:
-            df = pd.read_csv('game_stats.csv')
-        except FileNotFoundError:
+    def draw_chart(self, choice, fig, series):
+        """Draw one chart's series onto its figure"""
+        fig.clf()
+        ax = fig.add_subplot(111)
+        if series is None:
             ax.text(0.5, 0.5, 'No statistics data found to plot.',
                     ha='center', va='center', fontsize=12)
-            self.canvas.draw()
-            return
-
-        if choice == 'Dots Collected by Difficulty':
-            self.plot_dots_by_difficulty(ax, df)
+        elif choice == 'Dots Collected by Difficulty':
+            self.plot_dots_by_difficulty(ax, series)
         elif choice == 'Ghosts Eaten Over Sessions':
-            self.plot_ghosts_eaten(ax, df)
+            self.plot_ghosts_eaten(ax, series)
         elif choice == 'High Scores Per Session':
-            self.plot_high_scores(ax, df)
+            self.plot_high_scores(ax, series)
         elif choice == 'Player vs Ghost Ratio':
-            self.plot_player_vs_ghost(self.fig, df)
+            self.plot_player_vs_ghost(fig, series)
         elif choice == 'Stats by Difficulty':
-            self.plot_text_stats(ax, df)
-        self.canvas.draw()
+            self.plot_text_stats(ax, series)
+
+    def render_chart(self, choice, entry):
+        """Redraw a chart's figure unless it already shows this series version"""
+        key, series = entry
+        if self.drawn.get(choice) == key:
+            return
+        fig, canvas = self.charts[choice]
+        self.draw_chart(choice, fig, series)
+        canvas.draw()
+        self.drawn[choice] = key
+
+    def render_ready(self):
+        """Draw one chart the background prefetch has finished, then check again"""
+        if self.win is None:
+            return
+        pending = False
+        for choice in self.CHARTS:
+            entry = self.chart_cache.ready(choice)
+            if entry is None:
+                pending = True
+            elif self.drawn.get(choice) != entry[0]:
+                self.render_chart(choice, entry)
+                pending = True
+                break
+        if pending:
+            self.win.after(50, self.render_ready)
+
+    def update_plot(self, choice):
+        """Show the chart for a selection, redrawing it only if its data changed"""
+        self.render_chart(choice, self.chart_cache.get(choice))
+        fig, canvas = self.charts[choice]
+        if canvas is not self.canvas:
+            if self.canvas is not None:
+                self.canvas.get_tk_widget().pack_forget()
+            canvas.get_tk_widget().pack()
+            self.fig, self.canvas = fig, canvas
 
     def on_selection_change(self, _=None):
         """Handle selection change in combobox"""
@@ -248,18 +398,19 @@ class StatisticsManager:
     def go_back(self, back_callback):
         """Handle back button click"""
         self.win.destroy()
+        self.win = None
         if back_callback:
             back_callback()
 
     def quit_stats(self):
         """Handle quit button click"""
+        self.close()
         os._exit(0)
 
     def show_graph_selector(self, back_callback=None, btn_style=None):
         """Show graph selector window"""
-        try:
-            df = pd.read_csv('game_stats.csv')
-        except FileNotFoundError:
+        self.flush()
+        if not self.aggregates:
             print("No statistics data found to plot.")
             return
 
@@ -274,22 +425,25 @@ class StatisticsManager:
                          font=("Arial", 16, "bold"))
         label.pack(side=tk.LEFT, padx=(0, 10))
 
-        self.combo = ttk.Combobox(label_frame, values=[
-            'Dots Collected by Difficulty',
-            'Ghosts Eaten Over Sessions',
-            'High Scores Per Session',
-            'Player vs Ghost Ratio',
-            'Stats by Difficulty'
-        ])
+        self.combo = ttk.Combobox(label_frame, values=self.CHARTS)
         self.combo.pack(side=tk.LEFT)
 
-        self.fig = Figure(figsize=(8, 5))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.win)
-        self.canvas.get_tk_widget().pack()
+        chart_frame = tk.Frame(self.win, bg='black')
+        chart_frame.pack()
+        self.charts = {}
+        self.drawn = {}
+        self.fig = self.canvas = None
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        for choice in self.CHARTS:
+            fig = Figure(figsize=(8, 5))
+            self.charts[choice] = (fig, FigureCanvasTkAgg(fig, master=chart_frame))
 
         self.combo.bind("<<ComboboxSelected>>", self.on_selection_change)
         self.combo.current(0)
         self.update_plot(self.combo.get())
+        self.chart_cache.prefetch(self.CHARTS)
+        self.win.after(50, self.render_ready)
 
         back_btn = tk.Button(
             self.win, text="BACK", command=lambda: self.go_back(back_callback),
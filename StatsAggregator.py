@@ -0,0 +1,109 @@
+"""Statistics aggregator class"""
+import numpy as np
+import pandas as pd
+
+
+class StatsAggregator:
+    """Reduces statistics rows to every series the charts plot in one grouped pass
+
+    Rows are grouped once by (difficulty, duration, dots_collected) with
+    difficulty as a categorical. The group table is small compared with the
+    history, and each chart's series is a cheap re-grouping of it, so no
+    per-difficulty copy of the rows is ever made. Frames can be added one
+    chunk at a time.
+    """
+    DIFFICULTIES = ['easy', 'normal', 'hard']
+    KEYS = ['difficulty', 'duration', 'dots_collected']
+    SUMS = {'score_sum': 'score', 'ghosts_sum': 'ghosts_eaten', 'lives_sum': 'lives_lost'}
+
+    def __init__(self):
+        self.groups = None
+
+    def add_frame(self, df):
+        """Fold a frame of statistics rows into the group table"""
+        if df.empty:
+            return
+        difficulty = pd.Categorical(df['difficulty'], categories=self.DIFFICULTIES)
+        grouped = df.groupby([difficulty, df['duration'], df['dots_collected']],
+                             observed=True, sort=False).agg(
+            games=('score', 'size'),
+            **{name: (column, 'sum') for name, column in self.SUMS.items()})
+        grouped.index.names = self.KEYS
+        if self.groups is None:
+            self.groups = grouped
+        else:
+            self.groups = pd.concat([self.groups, grouped]).groupby(
+                level=self.KEYS, observed=True, sort=False).sum()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build an aggregator from a whole frame"""
+        aggregator = cls()
+        aggregator.add_frame(df)
+        return aggregator
+
+    @property
+    def empty(self):
+        """True when no rows have been added"""
+        return self.groups is None or self.groups.empty
+
+    def _by(self, *levels):
+        """Sum the group table over every key but the given ones"""
+        return self.groups.groupby(level=list(levels), observed=True).sum()
+
+    def difficulties(self):
+        """Difficulties that have rows, in display order"""
+        present = set(self.groups.index.get_level_values('difficulty'))
+        return [diff for diff in self.DIFFICULTIES if diff in present]
+
+    def mean_by_duration(self, name):
+        """Per difficulty, (durations, mean of a summed column per game) sorted by duration"""
+        by_duration = self._by('difficulty', 'duration')
+        means = by_duration[name] / by_duration['games']
+        series = {}
+        for diff in self.difficulties():
+            sub = means.xs(diff, level='difficulty').sort_index()
+            series[diff] = (sub.index.to_numpy(), sub.to_numpy())
+        return series
+
+    def totals(self):
+        """Per difficulty, the summed columns and the number of games"""
+        by_difficulty = self._by('difficulty')
+        return {diff: {name: int(value) for name, value in by_difficulty.loc[diff].items()}
+                for diff in self.difficulties()}
+
+    def dots_box_stats(self, whis=1.5):
+        """Per difficulty, box plot statistics of dots collected for Axes.bxp
+
+        Matches matplotlib's boxplot statistics, computed from value counts
+        instead of the raw column. Fliers are reported once per distinct value.
+        """
+        counts = self._by('difficulty', 'dots_collected')['games']
+        stats = {}
+        for diff in self.difficulties():
+            sub = counts.xs(diff, level='difficulty').sort_index()
+            values = sub.index.to_numpy(dtype=float)
+            cumulative = np.cumsum(sub.to_numpy())
+            n = cumulative[-1]
+
+            def percentile(p, values=values, cumulative=cumulative, n=n):
+                h = (n - 1) * p / 100.0
+                lo = int(np.floor(h))
+                x_lo = values[np.searchsorted(cumulative, lo, side='right')]
+                x_hi = values[np.searchsorted(cumulative, min(lo + 1, n - 1), side='right')]
+                return x_lo + (h - lo) * (x_hi - x_lo)
+
+            q1, med, q3 = percentile(25), percentile(50), percentile(75)
+            iqr = q3 - q1
+            below = values[values <= q3 + whis * iqr]
+            above = values[values >= q1 - whis * iqr]
+            whishi = below.max() if len(below) and below.max() >= q3 else q3
+            whislo = above.min() if len(above) and above.min() <= q1 else q1
+            stats[diff] = {
+                'label': diff.capitalize(),
+                'mean': float(np.dot(values, sub.to_numpy()) / n),
+                'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+                'whislo': whislo, 'whishi': whishi,
+                'fliers': values[(values < whislo) | (values > whishi)]
+            }
+        return stats
@@ -0,0 +1,382 @@
+"""Statistics store class"""
+import csv
+import os
+import sqlite3
+from contextlib import closing
+
+
+class StatsStore:
+    """SQLite storage for statistics rows, indexed by difficulty and timestamp
+
+    The first time a store is opened next to an existing CSV history, that
+    file is imported once; CSV stays available through export_csv.
+
+    A game is saved as several rows as it goes, so only the row that ends
+    a game enters the leaderboard. Rows handed to append_rows say so with
+    a 'final' key and count as final without one. In imported or older
+    histories a row ends its game when the next row has another difficulty,
+    a shorter duration or a lower score.
+    """
+    COLUMNS = ['timestamp', 'score', 'duration', 'lives_lost', 'dots_collected',
+               'ghosts_eaten', 'power_pellets_collected', 'difficulty']
+    INT_COLUMNS = ['score', 'duration', 'lives_lost', 'dots_collected',
+                   'ghosts_eaten', 'power_pellets_collected']
+    ALIASES = {'power_pellets_collected': 'power_pallets_collected'}
+    LEADERBOARD_SIZE = 10
+    DTYPES = {'score': 'int32', 'duration': 'int32', 'lives_lost': 'int8',
+              'dots_collected': 'int16', 'ghosts_eaten': 'int16',
+              'power_pellets_collected': 'int16', 'difficulty': 'category'}
+    ROW_BYTES = 512
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path='game_stats.db', csv_path='game_stats.csv'):
+        self.path = path
+        self.csv_path = csv_path
+        self._create_schema()
+        if csv_path and os.path.isfile(csv_path):
+            self.import_csv(csv_path)
+
+    def connect(self):
+        """Open a connection; each thread uses its own"""
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _create_schema(self):
+        """Create the stats table, its indexes and the import log"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats ("
+                "id INTEGER PRIMARY KEY, timestamp TEXT, score INTEGER, "
+                "duration INTEGER, lives_lost INTEGER, dots_collected INTEGER, "
+                "ghosts_eaten INTEGER, power_pellets_collected INTEGER, difficulty TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_difficulty_timestamp "
+                         "ON stats (difficulty, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_difficulty_score "
+                         "ON stats (difficulty, score)")
+            conn.execute("CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS aggregates ("
+                "difficulty TEXT PRIMARY KEY, rows INTEGER, score_sum INTEGER, "
+                "score_max INTEGER, duration_sum INTEGER)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(aggregates)")]
+            if 'games' in columns:
+                conn.execute("ALTER TABLE aggregates RENAME COLUMN games TO rows")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leaderboard ("
+                "difficulty TEXT, score INTEGER, timestamp TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_leaderboard_difficulty_score "
+                         "ON leaderboard (difficulty, score)")
+            if (conn.execute("SELECT COUNT(*) FROM aggregates").fetchone()[0] == 0
+                    and conn.execute("SELECT 1 FROM stats LIMIT 1").fetchone()):
+                self._rebuild_aggregates(conn)
+            elif conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                self._rebuild_leaderboard(conn)
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _row_values(self, row):
+        """Order a row dict as a tuple of column values
+
+        Rows from StatisticsManager.player_data spell the pellet column
+        'power_pallets_collected'; both spellings are accepted.
+        """
+        values = []
+        for column in self.COLUMNS:
+            value = row[column] if column in row else row[self.ALIASES[column]]
+            values.append(int(value) if column in self.INT_COLUMNS else value)
+        return tuple(values)
+
+    def _insert(self, conn, rows):
+        """Insert row dicts and fold them into the aggregates on an open connection"""
+        values = [self._row_values(row) for row in rows]
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        conn.executemany(
+            f"INSERT INTO stats ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+            values)
+        batch = {}
+        self._fold_values(batch, values, [row.get('final', True) for row in rows])
+        self._merge_aggregates(conn, batch)
+
+    def fold(self, aggregates, rows):
+        """Fold row dicts into an aggregates dict as returned by aggregates()"""
+        self._fold_values(aggregates, [self._row_values(row) for row in rows],
+                          [row.get('final', True) for row in rows])
+
+    def _fold_values(self, aggregates, values, finals):
+        """Fold row tuples into per-difficulty row count, sums, max and leaderboard
+
+        Only rows whose flag in finals is set go on the leaderboard.
+        """
+        timestamp_i = self.COLUMNS.index('timestamp')
+        score_i = self.COLUMNS.index('score')
+        duration_i = self.COLUMNS.index('duration')
+        difficulty_i = self.COLUMNS.index('difficulty')
+        touched = set()
+        for row, final in zip(values, finals):
+            difficulty = row[difficulty_i]
+            entry = aggregates.get(difficulty)
+            if entry is None:
+                entry = {'rows': 0, 'score_sum': 0, 'score_max': None,
+                         'duration_sum': 0, 'leaderboard': []}
+                aggregates[difficulty] = entry
+            score = row[score_i]
+            entry['rows'] += 1
+            entry['score_sum'] += score
+            entry['duration_sum'] += row[duration_i]
+            if entry['score_max'] is None or score > entry['score_max']:
+                entry['score_max'] = score
+            if not final:
+                continue
+            board = entry['leaderboard']
+            board.append((score, row[timestamp_i]))
+            touched.add(difficulty)
+            if len(board) > 4 * self.LEADERBOARD_SIZE:
+                self._trim(board)
+        for difficulty in touched:
+            self._trim(aggregates[difficulty]['leaderboard'])
+
+    def _trim(self, board):
+        """Sort a leaderboard best first and cut it to LEADERBOARD_SIZE"""
+        board.sort(key=lambda entry: (-entry[0], entry[1]))
+        del board[self.LEADERBOARD_SIZE:]
+
+    def _merge_aggregates(self, conn, batch):
+        """Add a batch's aggregates to the stored ones"""
+        conn.executemany(
+            "INSERT INTO aggregates (difficulty, rows, score_sum, score_max, duration_sum) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (difficulty) DO UPDATE SET "
+            "rows = rows + excluded.rows, "
+            "score_sum = score_sum + excluded.score_sum, "
+            "score_max = MAX(score_max, excluded.score_max), "
+            "duration_sum = duration_sum + excluded.duration_sum",
+            [(difficulty, entry['rows'], entry['score_sum'], entry['score_max'],
+              entry['duration_sum']) for difficulty, entry in batch.items()])
+        for difficulty, entry in batch.items():
+            conn.executemany(
+                "INSERT INTO leaderboard (difficulty, score, timestamp) VALUES (?, ?, ?)",
+                [(difficulty, score, timestamp) for score, timestamp in entry['leaderboard']])
+            self._trim_leaderboard(conn, difficulty)
+
+    def _trim_leaderboard(self, conn, difficulty):
+        """Keep only the best LEADERBOARD_SIZE stored entries of a difficulty"""
+        conn.execute(
+            "DELETE FROM leaderboard WHERE difficulty = ? AND rowid NOT IN ("
+            "SELECT rowid FROM leaderboard WHERE difficulty = ? "
+            "ORDER BY score DESC, timestamp LIMIT ?)",
+            (difficulty, difficulty, self.LEADERBOARD_SIZE))
+
+    def _rebuild_aggregates(self, conn):
+        """Recompute the aggregates from every stored row"""
+        conn.execute("DELETE FROM aggregates")
+        conn.execute(
+            "INSERT INTO aggregates (difficulty, rows, score_sum, score_max, duration_sum) "
+            "SELECT difficulty, COUNT(*), SUM(score), MAX(score), SUM(duration) "
+            "FROM stats GROUP BY difficulty")
+        self._rebuild_leaderboard(conn)
+
+    def _rebuild_leaderboard(self, conn):
+        """Rank the stored rows that end a game, judged by the row after each"""
+        conn.execute("DELETE FROM leaderboard")
+        difficulties = [row[0] for row in conn.execute("SELECT difficulty FROM aggregates")]
+        for difficulty in difficulties:
+            conn.execute(
+                "INSERT INTO leaderboard (difficulty, score, timestamp) "
+                "SELECT difficulty, score, timestamp FROM ("
+                "SELECT difficulty, score, timestamp, duration, "
+                "LEAD(difficulty) OVER w AS next_difficulty, "
+                "LEAD(duration) OVER w AS next_duration, LEAD(score) OVER w AS next_score "
+                "FROM stats WINDOW w AS (ORDER BY id)) "
+                "WHERE difficulty = ? AND (next_difficulty IS NULL "
+                "OR next_difficulty != difficulty OR next_duration < duration "
+                "OR next_score < score) "
+                "ORDER BY score DESC, timestamp LIMIT ?",
+                (difficulty, self.LEADERBOARD_SIZE))
+
+    def append_rows(self, rows):
+        """Insert a batch of row dicts in one transaction
+
+        A row with a false 'final' key is a snapshot of a game still going
+        and stays off the leaderboard.
+        """
+        with closing(self.connect()) as conn, conn:
+            self._insert(conn, rows)
+
+    def import_csv(self, csv_path, batch_size=10000):
+        """Import a CSV history once, atomically; returns the number of rows imported"""
+        source = os.path.abspath(csv_path)
+        count = 0
+        with closing(self.connect()) as conn, conn, \
+                open(csv_path, newline='', encoding='utf-8') as f:
+            if conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+                return 0
+            reader = csv.DictReader(f)
+            missing = [column for column in self.COLUMNS
+                       if column not in (reader.fieldnames or ())
+                       and self.ALIASES.get(column) not in (reader.fieldnames or ())]
+            if missing:
+                raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+            batch = []
+            previous = None
+            for row in reader:
+                if previous is not None:
+                    previous['final'] = self._ends_game(previous, row)
+                    batch.append(previous)
+                previous = row
+                if len(batch) >= batch_size:
+                    self._insert(conn, batch)
+                    count += len(batch)
+                    batch = []
+            if previous is not None:
+                batch.append(previous)
+            if batch:
+                self._insert(conn, batch)
+                count += len(batch)
+            conn.execute("INSERT INTO imports (source) VALUES (?)", (source,))
+        return count
+
+    @staticmethod
+    def timestamp_entry(timestamp, pacman):
+        """Pac-Man's progress at a time, as kept in StatisticsManager.timestamps"""
+        return {
+            'time': timestamp,
+            'score': pacman.score,
+            'dots': pacman.dots_collected,
+            'ghosts': pacman.ghosts_eaten,
+            'lives': pacman.lives
+        }
+
+    @staticmethod
+    def _ends_game(row, following):
+        """Whether a CSV row is the last of its game, given the row after it"""
+        return (following['difficulty'] != row['difficulty']
+                or int(following['duration']) < int(row['duration'])
+                or int(following['score']) < int(row['score']))
+
+    @staticmethod
+    def append_csv(filename, fieldnames, rows):
+        """Append row dicts to a CSV file, writing the header for a new file"""
+        file_exists = os.path.isfile(filename)
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def export_csv(self, filename):
+        """Write every stored row to a new CSV file"""
+        with closing(self.connect()) as conn, \
+                open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM stats ORDER BY id"))
+
+    def version(self):
+        """Return the mtime and size of the database and its WAL file
+
+        The value changes whenever rows are written, so it can key caches of
+        anything computed from the stored rows.
+        """
+        stamp = []
+        for path in (self.path, self.path + '-wal'):
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp.append(None)
+            else:
+                stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _where(self, difficulty=None, since=None):
+        """Build a WHERE clause on the indexed columns"""
+        clauses, params = [], []
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def row_count(self, difficulty=None):
+        """Count stored rows, optionally for one difficulty"""
+        where, params = self._where(difficulty)
+        with closing(self.connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM stats{where}", params).fetchone()[0]
+
+    def high_score(self, difficulty):
+        """Return the best score recorded for a difficulty, or None"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT score_max FROM aggregates WHERE difficulty = ?",
+                               (difficulty,)).fetchone()
+        return row[0] if row else None
+
+    def leaderboard(self, difficulty, k=None):
+        """Return up to k (score, timestamp) pairs for a difficulty, best first"""
+        k = min(k or self.LEADERBOARD_SIZE, self.LEADERBOARD_SIZE)
+        with closing(self.connect()) as conn:
+            return conn.execute(
+                "SELECT score, timestamp FROM leaderboard WHERE difficulty = ? "
+                "ORDER BY score DESC, timestamp LIMIT ?", (difficulty, k)).fetchall()
+
+    def aggregates(self):
+        """Return the running aggregates of every difficulty
+
+        Each entry holds rows (every stored row, several per game), score_sum,
+        score_max, duration_sum and a leaderboard of (score, timestamp)
+        pairs, best first.
+        """
+        with closing(self.connect()) as conn:
+            result = {
+                difficulty: {'rows': rows, 'score_sum': score_sum,
+                             'score_max': score_max, 'duration_sum': duration_sum,
+                             'leaderboard': []}
+                for difficulty, rows, score_sum, score_max, duration_sum in conn.execute(
+                    "SELECT difficulty, rows, score_sum, score_max, duration_sum "
+                    "FROM aggregates")}
+            for difficulty, score, timestamp in conn.execute(
+                    "SELECT difficulty, score, timestamp FROM leaderboard "
+                    "ORDER BY difficulty, score DESC, timestamp"):
+                if difficulty in result:
+                    result[difficulty]['leaderboard'].append((score, timestamp))
+        return result
+
+    def _dtypes(self, columns):
+        """Compact dtypes for the given columns"""
+        return {column: self.DTYPES[column] for column in columns if column in self.DTYPES}
+
+    def chunk_rows(self, memory_limit):
+        """Rows per chunk that keep a streamed read under memory_limit bytes
+
+        ROW_BYTES is a rough peak per row while a chunk is fetched from SQLite
+        as Python tuples and converted to a frame.
+        """
+        return max(1000, int(memory_limit) // self.ROW_BYTES)
+
+    def read_frame(self, columns=None, difficulty=None, since=None):
+        """Load only the requested columns and rows into a DataFrame"""
+        import pandas as pd
+        columns = columns or self.COLUMNS
+        where, params = self._where(difficulty, since)
+        with closing(self.connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM stats{where} ORDER BY id", conn,
+                params=params, dtype=self._dtypes(columns))
+
+    def iter_frames(self, columns=None, difficulty=None, since=None, chunksize=100000):
+        """Yield the requested rows as DataFrames of at most chunksize rows"""
+        import pandas as pd
+        columns = columns or self.COLUMNS
+        where, params = self._where(difficulty, since)
+        with closing(self.connect()) as conn:
+            yield from pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM stats{where} ORDER BY id", conn,
+                params=params, dtype=self._dtypes(columns), chunksize=chunksize)
+
+    @classmethod
+    def iter_csv_frames(cls, csv_path, columns=None, chunksize=100000):
+        """Yield a statistics CSV as DataFrames of at most chunksize rows"""
+        import pandas as pd
+        columns = columns or cls.COLUMNS
+        yield from pd.read_csv(csv_path, usecols=columns, chunksize=chunksize,
+                               dtype={column: cls.DTYPES[column] for column in columns
+                                      if column in cls.DTYPES})
@@ -0,0 +1,122 @@
+"""Statistics writer class"""
+import queue
+import threading
+import time
+
+
+class StatsWriter:
+    """Hands statistics rows to a sink in batches from a background thread
+
+    write() only enqueues a row; write_rows(rows) is called on the writer
+    thread with each batch. The queue is bounded, so a stalled disk slows
+    the producer down instead of growing memory without limit. A batch the
+    sink fails on is reported and counted in rows_failed, and the thread
+    carries on with the next one.
+    """
+
+    def __init__(self, write_rows, max_queue=1000, batch_size=100, flush_interval=1.0):
+        self.write_rows = write_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches_written = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def _ensure_thread(self):
+        """Start the background thread on first use"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="StatsWriter",
+                                               daemon=True)
+                self.thread.start()
+
+    def write(self, row):
+        """Queue one row dict for writing"""
+        self._ensure_thread()
+        self.queue.put(("row", row))
+
+    def flush(self, timeout=5.0):
+        """Block until every row queued so far is on disk; returns False on timeout"""
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self._ensure_thread()
+        self.queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush and stop the background thread"""
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(("stop", done))
+        flushed = done.wait(timeout)
+        self.thread.join(timeout)
+        self.thread = None
+        return flushed
+
+    def _run(self):
+        """Collect queued rows into batches and write them"""
+        while True:
+            try:
+                kind, item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            rows = []
+            waiters = []
+            stop = False
+            while True:
+                if kind == "row":
+                    rows.append(item)
+                else:
+                    waiters.append(item)
+                    stop = stop or kind == "stop"
+                if stop or len(rows) >= self.batch_size:
+                    break
+                try:
+                    kind, item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if rows:
+                    self._write_batch(rows)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+            if stop:
+                return
+
+    def _write_batch(self, rows):
+        """Write one batch of rows through the sink"""
+        start = time.perf_counter()
+        try:
+            self.write_rows(rows)
+        except Exception as e:
+            print(f"Could not write statistics: {type(e).__name__}: {e}")
+            self.rows_failed += len(rows)
+            return
+        latency = time.perf_counter() - start
+        self.rows_written += len(rows)
+        self.batches_written += 1
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    def counters(self):
+        """Return write and flush latency counters"""
+        return {
+            'rows_written': self.rows_written,
+            'rows_failed': self.rows_failed,
+            'batches_written': self.batches_written,
+            'queued': self.queue.qsize(),
+            'last_flush_latency': self.last_flush_latency,
+            'max_flush_latency': self.max_flush_latency,
+            'mean_flush_latency': self.total_flush_latency / self.batches_written
+            if self.batches_written else 0.0
+        }
@@ -0,0 +1,71 @@
+"""Tick profiler class"""
+import time
+from collections import deque
+
+
+class TickProfiler:
+    """Times the phases of each game tick over a rolling window
+
+    start() opens a tick and each mark(phase) records the time since the
+    previous mark under that phase; end() records the whole tick. Callers
+    hold the profiler as None when profiling is off, so a disabled profiler
+    costs one None check per phase.
+    """
+    PHASES = ['power_timer', 'ghost_ai', 'collisions', 'hud', 'sprites', 'stats',
+              'screen_update', 'total']
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in self.PHASES}
+        self.tick_start = 0.0
+        self.last = 0.0
+        self.ticks = 0
+
+    def start(self):
+        """Open a tick"""
+        self.tick_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Record the time since the previous mark as one sample of phase"""
+        now = time.perf_counter()
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = self.samples[phase] = deque(maxlen=self.window)
+        samples.append(now - self.last)
+        self.last = now
+
+    def end(self):
+        """Close the tick, recording its total time"""
+        self.samples['total'].append(time.perf_counter() - self.tick_start)
+        self.ticks += 1
+
+    def reset(self):
+        """Drop every sample"""
+        for samples in self.samples.values():
+            samples.clear()
+        self.ticks = 0
+
+    @staticmethod
+    def _percentile(ordered, p):
+        """Nearest-rank percentile of a sorted list"""
+        index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+        return ordered[index]
+
+    def percentiles(self):
+        """Return {phase: (p50, p95, p99, samples)} in seconds for phases with samples"""
+        result = {}
+        for phase, samples in self.samples.items():
+            if samples:
+                ordered = sorted(samples)
+                result[phase] = (self._percentile(ordered, 50), self._percentile(ordered, 95),
+                                 self._percentile(ordered, 99), len(ordered))
+        return result
+
+    def report(self):
+        """Format the phase percentiles as a table in milliseconds"""
+        report = "\nTick Phase Timing (ms)\n" + "=" * 24 + "\n"
+        report += f"{'Phase':<14}{'p50':>9}{'p95':>9}{'p99':>9}{'Samples':>9}\n"
+        for phase, (p50, p95, p99, count) in self.percentiles().items():
+            report += (f"{phase:<14}{p50 * 1000:9.3f}{p95 * 1000:9.3f}"
+                       f"{p99 * 1000:9.3f}{count:9d}\n")
+        return report
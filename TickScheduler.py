@@ -0,0 +1,107 @@
+"""Tick scheduler class"""
+import time
+from collections import deque
+
+
+class TickScheduler:
+    """Runs a tick callback at a fixed rate on the Tk event loop without sleeping
+
+    Ticks are scheduled against an absolute clock, so time spent inside a
+    tick or in the event loop is subtracted from the next wait. When the
+    loop falls behind it runs up to max_catch_up ticks per timer callback,
+    and drops the backlog once it is more than max_catch_up ticks behind.
+    """
+
+    def __init__(self, screen, tick, rate=10, max_catch_up=5, window=50):
+        """Initialize with a turtle screen, a tick callback and ticks per second
+
+        The tick callback returns False to stop the scheduler.
+        """
+        self.screen = screen
+        self.tick = tick
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self.max_catch_up = max_catch_up
+        self.running = False
+        self.paused = False
+        self.next_time = 0.0
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.tick_times = deque(maxlen=window)
+        self._generation = 0
+
+    def start(self):
+        """Start ticking from now"""
+        self._generation += 1
+        self.running = True
+        self.paused = False
+        self.next_time = time.perf_counter() + self.interval
+        self._schedule(self._generation)
+
+    def stop(self):
+        """Stop ticking; a pending timer callback becomes a no-op"""
+        self.running = False
+        self._generation += 1
+
+    def pause(self):
+        """Stop running ticks while keeping the schedule alive"""
+        self.paused = True
+
+    def resume(self):
+        """Resume ticking without catching up on the paused time"""
+        if self.paused:
+            self.paused = False
+            self.next_time = time.perf_counter() + self.interval
+            self.tick_times.clear()
+
+    def toggle_pause(self):
+        """Pause if running, resume if paused"""
+        if self.paused:
+            self.resume()
+        else:
+            self.pause()
+
+    def _schedule(self, generation):
+        """Arm the Tk timer for the next due tick"""
+        delay = max(0, int((self.next_time - time.perf_counter()) * 1000))
+        self.screen.ontimer(lambda: self._run(generation), delay)
+
+    def _run(self, generation):
+        """Run every tick that is due, then reschedule"""
+        if not self.running or generation != self._generation:
+            return
+        if self.paused:
+            self.next_time = time.perf_counter() + self.interval
+            self._schedule(generation)
+            return
+
+        steps = 0
+        while steps < self.max_catch_up and time.perf_counter() >= self.next_time:
+            self.next_time += self.interval
+            self.ticks += 1
+            self.tick_times.append(time.perf_counter())
+            steps += 1
+            if self.tick() is False:
+                self.stop()
+                return
+            if generation != self._generation:
+                return
+
+        now = time.perf_counter()
+        if now - self.next_time > self.interval * self.max_catch_up:
+            missed = int((now - self.next_time) / self.interval)
+            self.dropped_ticks += missed
+            self.next_time += missed * self.interval
+        self._schedule(generation)
+
+    def actual_rate(self):
+        """Ticks per second measured over the recent window"""
+        if len(self.tick_times) < 2:
+            return 0.0
+        elapsed = self.tick_times[-1] - self.tick_times[0]
+        return (len(self.tick_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        """Describe the measured tick rate against the target"""
+        return (f"Tick rate: {self.actual_rate():.1f}/s (target {self.rate}/s), "
+                f"{self.ticks} ticks, {self.dropped_ticks} dropped")
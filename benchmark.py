@@ -0,0 +1,59 @@
+"""Pixel Chomp benchmarks"""
+import argparse
+import os
+import sys
+from BenchmarkSuite import BenchmarkSuite
+
+BASELINE = os.path.join('benchmarks', 'baseline.json')
+
+
+def main(argv=None):
+    """Run the benchmark suite and compare it with the stored baseline"""
+    parser = argparse.ArgumentParser(description="Benchmark Pixel Chomp's hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BenchmarkSuite.SIZES),
+                        help="synthetic statistics rows per stats benchmark")
+    parser.add_argument('--scales', type=int, nargs='+', default=list(BenchmarkSuite.SCALES),
+                        help="maze scale factors; 1 is the bundled layout")
+    parser.add_argument('--arenas', type=int, nargs='+', default=list(BenchmarkSuite.ARENAS),
+                        help="sizes of the generated square mazes")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--only', nargs='+', metavar='TEXT',
+                        help="run only benchmarks whose name contains TEXT")
+    parser.add_argument('--data-dir', default='bench_data',
+                        help="where synthetic statistics databases are kept")
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=BenchmarkSuite.TOLERANCE,
+                        help="allowed slowdown against the baseline (default 0.25)")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(args.sizes, args.scales, args.repeats, args.data_dir, args.only,
+                           arenas=args.arenas)
+    document = suite.run()
+    BenchmarkSuite.save(document, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        BenchmarkSuite.save(document, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+        return 0
+    regressions = BenchmarkSuite.compare(document, BenchmarkSuite.load(args.baseline),
+                                         args.tolerance)
+    for name, before, now, ratio in regressions:
+        print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {now * 1000:.3f} ms "
+              f"({ratio:.2f}x)", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}",
+              file=sys.stderr)
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
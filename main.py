@@ -1,17 +1,23 @@
 """Pixel Chomp"""
+import argparse
 import turtle
 from GameController import GameController
 
 
 def main():
     """Set up the game"""
+    parser = argparse.ArgumentParser(description="Pixel Chomp")
+    parser.add_argument('--profile', action='store_true',
+                        help="time each phase of the game loop and print it at game over")
+    args = parser.parse_args()
+
     status_writer = turtle.Turtle()
     status_writer.color("white")
     status_writer.penup()
     status_writer.hideturtle()
     status_writer.speed(0)
 
-    controller = GameController(status_writer)
+    controller = GameController(status_writer, profile=args.profile)
     controller.show_main_menu()
 
 
@@ -0,0 +1,76 @@
+"""Pixel Chomp replays"""
+import argparse
+import sys
+import time
+from multiprocessing import Pool
+from ReplayLog import ReplayLog
+
+
+def replay_file(path):
+    """Replay one log headless and return (path, outcome, mismatched keys)"""
+    log = ReplayLog.load(path)
+    outcome, _ = log.replay()
+    return path, outcome, log.verify(outcome)
+
+
+def replay_rendered(path):
+    """Replay one log on screen, drawing every tick"""
+    import turtle
+    from Ghost import Ghost
+    from MazeRenderer import MazeRenderer
+    screen = turtle.Screen()
+    screen.bgcolor("black")
+    screen.tracer(0)
+    renderer = MazeRenderer()
+    log = ReplayLog.load(path)
+
+    def on_tick(engine):
+        pacman = engine.pacman
+        powered = pacman.state == "powered"
+        color = Ghost.frightened_color(pacman.power_timer, pacman.settings["power_duration"]) \
+            if powered else None
+        for ghost in engine.ghosts:
+            ghost.update_position(powered=powered, color=color)
+        screen.update()
+
+    outcome, _ = log.replay(render=True,
+                            on_start=lambda engine: renderer.draw(engine.maze, engine.difficulty),
+                            on_tick=on_tick)
+    return path, outcome, log.verify(outcome)
+
+
+def report(results):
+    """Print each replay's outcome and return how many mismatched"""
+    failed = 0
+    for path, outcome, mismatched in results:
+        status = "OK" if not mismatched else "MISMATCH " + ", ".join(mismatched)
+        failed += bool(mismatched)
+        print(f"{path}: score {outcome['score']}, lives {outcome['lives']}, "
+              f"{outcome['tick_count']} ticks  {status}")
+    return failed
+
+
+def main(argv=None):
+    """Replay recorded games and check they end the way they were recorded"""
+    parser = argparse.ArgumentParser(description="Replay recorded Pixel Chomp games.")
+    parser.add_argument('logs', nargs='+', help="replay logs (.pcr) to run")
+    parser.add_argument('--render', action='store_true',
+                        help="draw the game while replaying (one log at a time)")
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help="worker processes for headless replays (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.render:
+        failed = report(map(replay_rendered, args.logs))
+    elif len(args.logs) == 1 or args.processes == 1:
+        failed = report(map(replay_file, args.logs))
+    else:
+        with Pool(args.processes) as pool:
+            failed = report(pool.imap(replay_file, args.logs, chunksize=16))
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.logs)} replays in {elapsed:.2f}s, {failed} mismatched")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
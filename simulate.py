@@ -0,0 +1,94 @@
+"""Pixel Chomp batch simulator"""
+import argparse
+import sys
+from BatchSimulator import BatchSimulator
+from GameEngine import DIFFICULTY_SETTINGS
+from MazeGenerator import MazeGenerator
+from StatsStore import StatsStore
+
+
+def parse_setting(text):
+    """Parse a KEY=VALUE difficulty setting override"""
+    key, sep, value = text.partition('=')
+    if not sep or key not in DIFFICULTY_SETTINGS['easy']:
+        raise argparse.ArgumentTypeError(
+            f"expected KEY=VALUE with KEY one of {', '.join(DIFFICULTY_SETTINGS['easy'])}")
+    return key, int(value)
+
+
+def parse_maze_size(text):
+    """Parse a WIDTHxHEIGHT generated maze size"""
+    try:
+        width, height = MazeGenerator.parse_size(text)
+        MazeGenerator(width, height)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return width, height
+
+
+def main(argv=None):
+    """Run seeded headless games and write their statistics"""
+    parser = argparse.ArgumentParser(description="Play seeded Pixel Chomp games without a display.")
+    parser.add_argument('-n', '--games', type=int, default=100,
+                        help="games per difficulty (default 100)")
+    parser.add_argument('-d', '--difficulty', nargs='+', choices=list(DIFFICULTY_SETTINGS),
+                        default=list(DIFFICULTY_SETTINGS))
+    parser.add_argument('-p', '--policy', choices=BatchSimulator.POLICIES, default='random')
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--set', dest='settings', type=parse_setting, action='append',
+                        default=[], metavar='KEY=VALUE',
+                        help="override a difficulty setting, e.g. ghost_speed=2")
+    parser.add_argument('--max-ticks', type=int, default=BatchSimulator.MAX_TICKS)
+    parser.add_argument('--maze', type=parse_maze_size, metavar='WIDTHxHEIGHT',
+                        help="play on a generated maze of this size instead of the bundled ones")
+    parser.add_argument('--maze-seed', type=int, default=0, help="seed of the generated maze")
+    parser.add_argument('-o', '--output', default='simulated_stats.csv',
+                        help="CSV file to append results to")
+    parser.add_argument('--db', help="append results to this statistics database instead")
+    parser.add_argument('--batch', type=int, default=1000, help="rows written per batch")
+    args = parser.parse_args(argv)
+
+    simulator = BatchSimulator(args.difficulty, args.games, args.policy, args.seed,
+                               args.processes, dict(args.settings), args.max_ticks,
+                               args.maze + (args.maze_seed,) if args.maze else None)
+    if args.db:
+        write_rows = StatsStore(args.db, None).append_rows
+    else:
+        fieldnames = list(StatsStore.COLUMNS)
+        fieldnames[fieldnames.index('power_pellets_collected')] = 'power_pallets_collected'
+
+        def write_rows(rows):
+            StatsStore.append_csv(args.output, fieldnames, rows)
+
+    totals = {}
+    batch = []
+    for row in simulator.run():
+        outcome = row.pop('outcome')
+        batch.append(row)
+        total = totals.setdefault(row['difficulty'],
+                                  {'games': 0, 'score': 0, 'cleared': 0, 'timeout': 0})
+        total['games'] += 1
+        total['score'] += row['score']
+        if outcome in total:
+            total[outcome] += 1
+        if len(batch) >= args.batch:
+            write_rows(batch)
+            batch = []
+            print(f"{simulator.games_played} games, "
+                  f"{simulator.games_per_second():.1f} games/s", file=sys.stderr)
+    if batch:
+        write_rows(batch)
+
+    for difficulty, total in totals.items():
+        print(f"{difficulty}: {total['games']} games, "
+              f"mean score {total['score'] / total['games']:.1f}, "
+              f"cleared {total['cleared'] / total['games']:.1%}, "
+              f"timed out {total['timeout'] / total['games']:.1%}")
+    print(f"{simulator.games_played} games in {simulator.elapsed:.1f}s "
+          f"({simulator.games_per_second():.1f} games/s)")
+
+
+if __name__ == "__main__":
+    main()